@@ -16,15 +16,27 @@ Copyright (c) 2025
 Distributed under the terms of the GNU Public License (GPLv3)
 """
 
+import bisect
+import functools
+import hashlib
+import http.client
 import json
 import logging
+import os
+import random
 import threading
 import time
-from typing import Optional, Dict, Any
+from types import MappingProxyType
+from typing import Optional, Dict, Any, ClassVar, Mapping, NamedTuple, Tuple
 from urllib.parse import urlencode
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
-from socket import timeout as socket_timeout
+from socket import SHUT_RDWR, timeout as socket_timeout
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+
+try:
+    # orjson parses raw bytes several times faster than the stdlib
+    import orjson as json_parser
+except ImportError:
+    json_parser = json
 
 import weewx
 from weewx.engine import StdService
@@ -36,6 +48,46 @@ log = logging.getLogger(__name__)
 # Extension version
 VERSION = "1.0.0"
 
+# IQ Air API endpoint
+API_HOST = "api.airvisual.com"
+API_PATH = "/v2/nearest_city"
+REQUEST_HEADERS = MappingProxyType({
+    'User-Agent': f'WeeWX-AirVisual/{VERSION}',
+    'Accept': 'application/json'
+})
+
+# Clock for all scheduling deadlines and data ages. Monotonic, so NTP
+# adjustments of the wall clock can't stall retries or expire fresh data.
+_now = time.monotonic
+
+# US EPA AQI category upper bounds (inclusive) and their labels; any
+# value above the last breakpoint is "Hazardous"
+_AQI_BREAKPOINTS = (50, 100, 150, 200, 300)
+_AQI_LABELS = (
+    "Good",
+    "Moderate",
+    "Unhealthy for Sensitive Groups",
+    "Unhealthy",
+    "Very Unhealthy",
+    "Hazardous"
+)
+
+# IQ Air pollutant codes and their readable names
+_POLLUTANT_MAP = MappingProxyType({
+    'p2': 'PM2.5',
+    'p1': 'PM10',
+    'o3': 'Ozone',
+    'n2': 'NO2',
+    's2': 'SO2',
+    'co': 'CO'
+})
+VALID_POLLUTANTS = frozenset(_POLLUTANT_MAP)
+
+# Parsed and validated configuration, keyed by weewx.conf path and
+# stamped with the file's (mtime, size) so reloads of an unchanged file
+# skip re-parsing and re-validation
+_CONFIG_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
 # Unit system setup for AQI data
 weewx.units.obs_group_dict['aqi'] = 'group_aqi'
 weewx.units.obs_group_dict['main_pollutant'] = 'group_count'
@@ -51,6 +103,14 @@ weewx.units.default_unit_format_dict['aqi'] = '%.0f'
 weewx.units.default_unit_label_dict['aqi'] = ' AQI'
 
 
+class AirQualitySnapshot(NamedTuple):
+    """One air quality reading, as injected into archive records."""
+    aqi: int
+    main_pollutant: Optional[str]
+    aqi_level: Optional[str]
+    timestamp: float  # _now() when collected
+
+
 class AirVisualService(StdService):
     """
     WeeWX service to collect air quality data from IQ Air's AirVisual API.
@@ -63,21 +123,31 @@ class AirVisualService(StdService):
     - Full HTTP client with comprehensive error handling
     """
     
+    # Worker pool shared by all running instances for API collections
+    _executor: ClassVar[Optional[ThreadPoolExecutor]] = None
+    _executor_users: ClassVar[int] = 0
+    _executor_lock: ClassVar[threading.Lock] = threading.Lock()
+    
     def __init__(self, engine, config_dict):
         """Initialize the AirVisual service."""
         super(AirVisualService, self).__init__(engine, config_dict)
         
-        log.info(f"AirVisual service version {VERSION} starting")
+        log.info("AirVisual service version %s starting", VERSION)
         
-        # Parse configuration from weewx.conf
-        self.config = self._parse_config(config_dict)
+        # Parse and validate configuration from weewx.conf
+        self.config = self._load_config(config_dict)
         
-        # Validate configuration
-        self._validate_config()
+        # The request never changes, so build its path once
+        self._request_path = build_request_path(
+            self.config['latitude'], self.config['longitude'], self.config['api_key']
+        )
         
         # Thread-safe data storage
         self.data_lock = threading.Lock()
-        self.latest_data: Dict[str, Any] = {}
+        self.latest_data: Optional[AirQualitySnapshot] = None
+        
+        # Allow injected data to be up to 2 intervals old
+        self._max_data_age = self.config['interval'] * 2
         
         # Retry state management
         self.retry_state = {
@@ -87,21 +157,65 @@ class AirVisualService(StdService):
             'last_success_time': None
         }
         
-        # Background thread management
-        self.api_thread: Optional[threading.Thread] = None
+        # Background collection management. Collections are started from
+        # WeeWX's own LOOP packets once _next_collection (a _now() deadline)
+        # has passed, and run on the shared worker pool.
+        self.collection_executor: Optional[ThreadPoolExecutor] = None
+        self.collection_future: Optional[Future] = None
+        self._next_collection = 0.0
         self.shutdown_event = threading.Event()
         
-        # Start background data collection if enabled
-        if self.config['enable']:
-            self._start_background_thread()
+        # Persistent HTTP connection, reused across polls (keep-alive)
+        self._connection: Optional[http.client.HTTPSConnection] = None
         
-        # Bind to archive record events
-        self.bind(weewx.NEW_ARCHIVE_RECORD, self.new_archive_record)
+        # Validators and body hash of the last parsed API response, used to
+        # skip re-parsing unchanged data
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._body_hash: Optional[bytes] = None
+        
+        # Start background data collection and bind to WeeWX events only
+        # if enabled
+        if self.config['enable']:
+            self._start_collection()
+            self.bind(weewx.NEW_LOOP_PACKET, self.new_loop_packet)
+            self.bind(weewx.NEW_ARCHIVE_RECORD, self.new_archive_record)
         
         log.info("AirVisual service initialized successfully")
     
+    def _load_config(self, config_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the parsed and validated configuration.
+        
+        Reuses the cached result when weewx.conf has not changed since it
+        was last parsed and validated.
+        """
+        config_path = getattr(config_dict, 'filename', None)
+        stamp = _config_file_stamp(config_path)
+        cached = _CONFIG_CACHE.get(config_path) if stamp is not None else None
+        
+        if cached is not None and cached[0] == stamp:
+            log.debug("Using cached configuration for %s", config_path)
+            self.config = dict(cached[1])
+        else:
+            self.config = self._parse_config(config_dict)
+            self._validate_config()
+            
+            if stamp is not None:
+                _CONFIG_CACHE[config_path] = (stamp, dict(self.config))
+        
+        # Logging is cheap, so every start reports its configuration
+        self._log_config()
+        return self.config
+    
     def _parse_config(self, config_dict: Dict[str, Any]) -> Dict[str, Any]:
-        """Parse configuration from weewx.conf."""
+        """
+        Parse configuration from weewx.conf.
+        
+        Only called when _load_config has no cached result for the current
+        weewx.conf, so the numeric conversions below run once per version
+        of the file rather than on every service start.
+        """
         
         # Get service-specific configuration
         service_config = config_dict.get('AirVisualService', {})
@@ -128,13 +242,14 @@ class AirVisualService(StdService):
             'retry_multiplier': float(service_config.get('retry_multiplier', 2.0)) # Double each time
         }
         
-        log.debug(f"Parsed configuration: {config}")
+        # Guarded: even lazy formatting of the whole dict is not free
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Parsed configuration: %s", config)
         return config
     
     def _validate_config(self) -> None:
-        """Validate configuration parameters."""
+        """Validate configuration parameters, raising if they are unusable."""
         if not self.config['enable']:
-            log.info("AirVisual service is disabled in configuration")
             return
         
         # Validate required API key
@@ -163,34 +278,77 @@ class AirVisualService(StdService):
                 "AirVisual service: Station coordinates not configured. "
                 "Please set latitude and longitude in [Station] section of weewx.conf"
             )
+    
+    def _log_config(self) -> None:
+        """Log the configuration in use and warn about risky settings."""
+        if not self.config['enable']:
+            log.info("AirVisual service is disabled in configuration")
+            return
         
         # Warn about short intervals
         if self.config['interval'] < 300:  # 5 minutes
             log.warning(
-                f"AirVisual service: interval {self.config['interval']} seconds "
-                "is very short and may quickly exhaust API quota (10,000 calls/month)"
+                "AirVisual service: interval %s seconds "
+                "is very short and may quickly exhaust API quota (10,000 calls/month)",
+                self.config['interval']
             )
         
         log.info(
-            f"AirVisual service configured: "
-            f"lat={self.config['latitude']}, lon={self.config['longitude']}, "
-            f"interval={self.config['interval']}s"
+            "AirVisual service configured: lat=%s, lon=%s, interval=%ss",
+            self.config['latitude'], self.config['longitude'],
+            self.config['interval']
         )
     
-    def _start_background_thread(self):
-        """Start the background thread for API data collection."""
-        if self.api_thread is None or not self.api_thread.is_alive():
-            self.api_thread = threading.Thread(
-                target=self._api_collection_loop,
-                name='AirVisualAPI',
-                daemon=True
-            )
-            self.api_thread.start()
-            log.info("Started AirVisual API collection thread")
+    @classmethod
+    def _acquire_executor(cls) -> ThreadPoolExecutor:
+        """Return the shared worker pool, creating it if needed."""
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=2,
+                    thread_name_prefix='AirVisualAPI'
+                )
+            cls._executor_users += 1
+            return cls._executor
+    
+    @classmethod
+    def _release_executor(cls) -> None:
+        """Drop one user of the shared worker pool, stopping it after the last."""
+        with cls._executor_lock:
+            cls._executor_users -= 1
+            if cls._executor_users > 0 or cls._executor is None:
+                return
+            executor = cls._executor
+            cls._executor = None
+        executor.shutdown(wait=False)
     
-    def _api_collection_loop(self):
+    def _start_collection(self):
+        """Join the shared worker pool and start the first collection."""
+        if self.collection_executor is None:
+            self.collection_executor = self._acquire_executor()
+            self._submit_collection()
+            log.info("Started AirVisual API collection")
+    
+    def _submit_collection(self) -> None:
+        """Hand a collection to the shared worker pool."""
+        executor = self.collection_executor
+        if executor is None or self.shutdown_event.is_set():
+            return
+        self.collection_future = executor.submit(self._run_collection)
+    
+    def new_loop_packet(self, event):
+        """Start an API collection if one is due; never blocks the main loop."""
+        if _now() < self._next_collection:
+            return
+        
+        # Only one collection in flight per service
+        future = self.collection_future
+        if future is None or future.done():
+            self._submit_collection()
+    
+    def _run_collection(self):
         """
-        Background thread loop for collecting API data.
+        Run one API collection and set when the next one is due.
         
         Implements exponential backoff retry logic:
         - Normal operation: collect every 'interval' seconds
@@ -198,56 +356,49 @@ class AirVisualService(StdService):
         - On success after failures: reset to normal interval
         - Never give up - keeps retrying indefinitely
         """
-        log.info("AirVisual API collection thread started")
+        if self.shutdown_event.is_set():
+            return
         
-        while not self.shutdown_event.is_set():
-            try:
-                current_time = time.time()
-                
-                # Check if we're in a retry backoff period
-                if current_time < self.retry_state['next_retry_time']:
-                    # Still waiting for retry time - sleep and continue
-                    sleep_time = min(60, self.retry_state['next_retry_time'] - current_time)
-                    if self.shutdown_event.wait(sleep_time):
-                        break  # Shutdown requested
-                    continue
-                
-                # Time to attempt data collection
-                log.debug("Attempting to collect air quality data")
-                
-                # Collect air quality data from API
-                success = self._collect_air_quality_data()
+        try:
+            current_time = _now()
+            
+            log.debug("Attempting to collect air quality data")
+            
+            # Collect air quality data from API
+            success = self._collect_air_quality_data()
+            
+            if success:
+                # Success - reset retry state and use normal interval
+                if self.retry_state['consecutive_failures'] > 0:
+                    log.info(
+                        "AirVisual API connection restored after %d failures",
+                        self.retry_state['consecutive_failures']
+                    )
                 
-                if success:
-                    # Success - reset retry state and use normal interval
-                    if self.retry_state['consecutive_failures'] > 0:
-                        log.info(
-                            f"AirVisual API connection restored after "
-                            f"{self.retry_state['consecutive_failures']} failures"
-                        )
-                    
-                    self._reset_retry_state()
-                    next_collection = current_time + self.config['interval']
-                    
-                else:
-                    # Failure - implement exponential backoff
-                    self._handle_api_failure()
-                    next_collection = self.retry_state['next_retry_time']
+                self._reset_retry_state()
+                next_collection = current_time + self.config['interval']
                 
-                # Sleep until next collection time
-                sleep_time = next_collection - time.time()
-                if sleep_time > 0:
-                    if self.shutdown_event.wait(sleep_time):
-                        break  # Shutdown requested
+            elif self.shutdown_event.is_set():
+                # Failed because shutDown aborted the request - not an API failure
+                return
                 
-            except Exception as e:
-                log.error(f"Unexpected error in API collection thread: {e}")
-                # Treat unexpected errors as API failures
+            else:
+                # Failure - implement exponential backoff
                 self._handle_api_failure()
-                if self.shutdown_event.wait(60):  # Wait 1 minute before retrying
-                    break
+                next_collection = self.retry_state['next_retry_time']
+            
+        except Exception as e:
+            if self.shutdown_event.is_set():
+                return
+            log.error("Unexpected error in API collection: %s", e)
+            # Treat unexpected errors as API failures, waiting at least
+            # 1 minute before retrying
+            self._handle_api_failure()
+            next_collection = max(
+                _now() + 60, self.retry_state['next_retry_time']
+            )
         
-        log.info("AirVisual API collection thread stopped")
+        self._next_collection = next_collection
     
     def _collect_air_quality_data(self) -> bool:
         """
@@ -257,94 +408,180 @@ class AirVisualService(StdService):
             bool: True if successful, False if failed
         """
         try:
-            # Build API request URL
-            api_url = "http://api.airvisual.com/v2/nearest_city"
-            params = {
-                'lat': self.config['latitude'],
-                'lon': self.config['longitude'],
-                'key': self.config['api_key']
-            }
-            
-            # Construct full URL with parameters
-            full_url = f"{api_url}?{urlencode(params)}"
-            
-            # Create request with proper headers
-            request = Request(full_url)
-            request.add_header('User-Agent', f'WeeWX-AirVisual/{VERSION}')
-            request.add_header('Accept', 'application/json')
-            
-            log.debug(f"Requesting air quality data from IQ Air API")
-            
-            # Make HTTP request with timeout
-            with urlopen(request, timeout=self.config['timeout']) as response:
-                if response.status != 200:
-                    if self.config['log_errors']:
-                        log.error(f"API returned HTTP {response.status}")
-                    return False
-                
-                # Read and parse JSON response
-                response_data = response.read().decode('utf-8')
-                data = json.loads(response_data)
+            log.debug("Requesting air quality data from IQ Air API")
+            
+            # Make a conditional HTTP request over the persistent connection
+            response, response_data = self._request(
+                self._request_path, self._conditional_headers()
+            )
+            status = response.status
+            
+            if status == 304:
+                # Not modified - the current data is still the latest
+                log.debug("API response not modified")
+                return self._refresh_latest_data()
+            
+            if status != 200:
+                # Handle specific HTTP error codes
+                if self.config['log_errors']:
+                    if status == 401:
+                        log.error("API authentication failed - check API key")
+                    elif status == 429:
+                        log.error("API rate limit exceeded - will retry with backoff")
+                    elif 500 <= status < 600:
+                        log.error("API server error (HTTP %d) - will retry", status)
+                    else:
+                        log.error("API request failed with HTTP %d", status)
+                return False
+            
+            # Skip parsing when the body is identical to the last one
+            body_hash = hashlib.blake2b(response_data, digest_size=16).digest()
+            if body_hash == self._body_hash:
+                log.debug("API response unchanged")
+                return self._refresh_latest_data()
+            
+            # Parse JSON response straight from the raw bytes
+            data = json_parser.loads(response_data)
             
             # Validate response structure and extract data
             air_quality_data = self._parse_api_response(data)
             if air_quality_data is None:
                 return False
             
+            # Remember validators for the next conditional request
+            self._etag = response.getheader('ETag')
+            self._last_modified = response.getheader('Last-Modified')
+            self._body_hash = body_hash
+            
             # Store data thread-safely
             with self.data_lock:
                 self.latest_data = air_quality_data
             
             if self.config['log_success']:
                 log.info(
-                    f"Collected air quality data: AQI={air_quality_data['aqi']}, "
-                    f"pollutant={air_quality_data['main_pollutant']}, "
-                    f"level={air_quality_data['aqi_level']}"
+                    "Collected air quality data: AQI=%s, pollutant=%s, level=%s",
+                    air_quality_data.aqi,
+                    air_quality_data.main_pollutant,
+                    air_quality_data.aqi_level
                 )
             
             return True
             
-        except HTTPError as e:
-            # Handle specific HTTP error codes
-            if e.code == 401:
-                if self.config['log_errors']:
-                    log.error("API authentication failed - check API key")
-            elif e.code == 429:
-                if self.config['log_errors']:
-                    log.error("API rate limit exceeded - will retry with backoff")
-            elif 500 <= e.code < 600:
-                if self.config['log_errors']:
-                    log.error(f"API server error (HTTP {e.code}) - will retry")
-            else:
-                if self.config['log_errors']:
-                    log.error(f"API request failed with HTTP {e.code}")
-            return False
-            
-        except URLError as e:
-            # Handle network/DNS errors
-            if self.config['log_errors']:
-                log.error(f"Network error connecting to API: {e.reason}")
-            return False
-            
         except socket_timeout:
             # Handle request timeouts
             if self.config['log_errors']:
-                log.error(f"API request timed out after {self.config['timeout']} seconds")
+                log.error("API request timed out after %s seconds", self.config['timeout'])
+            return False
+            
+        except (OSError, http.client.HTTPException) as e:
+            # Handle network/DNS/protocol errors, except for a request
+            # aborted by shutDown
+            if self.config['log_errors'] and not self.shutdown_event.is_set():
+                log.error("Network error connecting to API: %s", e)
             return False
             
-        except json.JSONDecodeError as e:
-            # Handle invalid JSON responses
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            # Handle invalid JSON responses (orjson's error subclasses json's)
             if self.config['log_errors']:
-                log.error(f"Invalid JSON response from API: {e}")
+                log.error("Invalid JSON response from API: %s", e)
             return False
             
         except Exception as e:
             # Handle any other unexpected errors
             if self.config['log_errors']:
-                log.error(f"Unexpected error collecting air quality data: {e}")
+                log.error("Unexpected error collecting air quality data: %s", e)
             return False
     
-    def _parse_api_response(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def _get_connection(self) -> http.client.HTTPSConnection:
+        """Return the persistent API connection, creating it if needed."""
+        if self._connection is None:
+            self._connection = http.client.HTTPSConnection(
+                API_HOST, timeout=self.config['timeout']
+            )
+        return self._connection
+    
+    def _conditional_headers(self) -> Mapping[str, str]:
+        """Return request headers, with validators from the last response."""
+        if self._etag:
+            return {**REQUEST_HEADERS, 'If-None-Match': self._etag}
+        if self._last_modified:
+            return {**REQUEST_HEADERS, 'If-Modified-Since': self._last_modified}
+        return REQUEST_HEADERS
+    
+    def _refresh_latest_data(self) -> bool:
+        """
+        Mark the current data as fresh after an unchanged API response.
+        
+        Returns:
+            bool: True if there was data to refresh, False otherwise
+        """
+        with self.data_lock:
+            if self.latest_data is None:
+                return False
+            self.latest_data = self.latest_data._replace(timestamp=_now())
+        return True
+    
+    def _request(
+        self, path: str, headers: Mapping[str, str]
+    ) -> Tuple[http.client.HTTPResponse, bytes]:
+        """
+        Send a GET request over the persistent API connection.
+        
+        If a reused connection turns out to have been closed by the server
+        while idle between polls, the request is retried once on a fresh
+        connection.
+        
+        Args:
+            path: Request path including query string
+            headers: Request headers
+            
+        Returns:
+            Tuple of (HTTP response, raw response body)
+        """
+        reused = self._connection is not None
+        connection = self._get_connection()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            # Always drain the body so the connection can be reused
+            body = response.read()
+        except (ConnectionResetError, BrokenPipeError):
+            self._close_connection()
+            if not reused or self.shutdown_event.is_set():
+                raise
+            # Stale keep-alive connection - retry once on a new one
+            log.debug("API connection closed by server, reconnecting")
+            return self._request(path, headers)
+        except Exception:
+            # Connection is in an unknown state - drop it
+            self._close_connection()
+            raise
+        
+        if response.will_close:
+            self._close_connection()
+        
+        return response, body
+    
+    def _abort_request(self):
+        """Unblock an in-flight API request by shutting down its socket."""
+        connection = self._connection
+        sock = getattr(connection, 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(SHUT_RDWR)
+            except OSError:
+                pass
+    
+    def _close_connection(self):
+        """Close and discard the persistent API connection."""
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+    
+    def _parse_api_response(self, data: Dict[str, Any]) -> Optional[AirQualitySnapshot]:
         """
         Parse and validate API response data.
         
@@ -352,74 +589,74 @@ class AirVisualService(StdService):
             data: JSON response from IQ Air API
             
         Returns:
-            Dict with parsed air quality data, or None if invalid
+            AirQualitySnapshot with parsed air quality data, or None if invalid
         """
         try:
             # Check response status
             if data.get('status') != 'success':
                 if self.config['log_errors']:
-                    log.error(f"API returned error status: {data.get('status')}")
+                    log.error("API returned error status: %s", data.get('status'))
                 return None
             
-            # Navigate to pollution data
-            current_data = data.get('data', {})
-            if not current_data:
+            # Extract key fields (US standard only). The API almost always
+            # returns the full structure, so index directly and handle a
+            # missing section in one place.
+            try:
+                current_data = data['data']
+                pollution_data = current_data['current']['pollution']
+                aqius = pollution_data['aqius']
+                mainus = pollution_data['mainus']
+            except KeyError as e:
                 if self.config['log_errors']:
-                    log.error("API response missing 'data' section")
+                    log.error("API response missing '%s' field", e.args[0])
                 return None
-            
-            pollution_data = current_data.get('current', {}).get('pollution', {})
-            if not pollution_data:
+            except TypeError:
                 if self.config['log_errors']:
-                    log.error("API response missing pollution data")
+                    log.error("API response has unexpected structure")
                 return None
             
-            # Extract key fields (US standard only)
-            aqius = pollution_data.get('aqius')
-            mainus = pollution_data.get('mainus')
-            
             # Validate AQI value
             if aqius is None:
                 if self.config['log_errors']:
-                    log.error("API response missing 'aqius' field")
+                    log.error("API response has empty 'aqius' field")
                 return None
             
-            if not isinstance(aqius, (int, float)) or aqius < 0:
+            aqi = coerce_aqi(aqius)
+            if aqi is None:
                 if self.config['log_errors']:
-                    log.error(f"Invalid AQI value: {aqius}")
+                    log.error("Invalid AQI value: %s", aqius)
                 return None
             
             # Validate main pollutant code
             if mainus is None:
                 if self.config['log_errors']:
-                    log.error("API response missing 'mainus' field")
+                    log.error("API response has empty 'mainus' field")
                 return None
             
-            valid_pollutants = ['p2', 'p1', 'o3', 'n2', 's2', 'co']
-            if mainus not in valid_pollutants:
+            if mainus not in VALID_POLLUTANTS:
                 if self.config['log_errors']:
-                    log.warning(f"Unknown pollutant code: {mainus}")
+                    log.warning("Unknown pollutant code: %s", mainus)
             
             # Convert data to our format
-            air_quality_data = {
-                'aqi': int(aqius),
-                'main_pollutant': convert_pollutant_code(mainus),
-                'aqi_level': convert_aqi_to_level(aqius),
-                'timestamp': time.time()
-            }
+            air_quality_data = AirQualitySnapshot(
+                aqi=aqi,
+                main_pollutant=convert_pollutant_code(mainus),
+                aqi_level=convert_aqi_to_level(aqi),
+                timestamp=_now()
+            )
             
             # Log location info for debugging (only on success)
             if self.config['log_success']:
                 city = current_data.get('city', 'Unknown')
                 state = current_data.get('state', 'Unknown')
                 country = current_data.get('country', 'Unknown')
-                log.debug(f"Data from: {city}, {state}, {country}")
+                log.debug("Data from: %s, %s, %s", city, state, country)
             
             return air_quality_data
             
         except Exception as e:
             if self.config['log_errors']:
-                log.error(f"Error parsing API response: {e}")
+                log.error("Error parsing API response: %s", e)
             return None
     
     def _reset_retry_state(self):
@@ -427,20 +664,22 @@ class AirVisualService(StdService):
         self.retry_state.update({
             'consecutive_failures': 0,
             'current_wait_time': self.config['retry_wait_base'],
-            'last_success_time': time.time()
+            'last_success_time': _now()
         })
     
     def _handle_api_failure(self):
-        """Handle API failure with exponential backoff."""
+        """Handle API failure with jittered exponential backoff."""
         self.retry_state['consecutive_failures'] += 1
         
-        # Calculate next retry time with exponential backoff
-        wait_time = min(
+        # Calculate next retry time with exponential backoff, jittered so
+        # that many stations failing together don't retry in lockstep
+        wait_cap = min(
             self.retry_state['current_wait_time'],
             self.config['retry_wait_max']
         )
+        wait_time = random.uniform(wait_cap * 0.5, wait_cap)
         
-        self.retry_state['next_retry_time'] = time.time() + wait_time
+        self.retry_state['next_retry_time'] = _now() + wait_time
         
         # Increase wait time for next failure (exponential backoff)
         self.retry_state['current_wait_time'] = min(
@@ -450,36 +689,32 @@ class AirVisualService(StdService):
         
         if self.config['log_errors']:
             log.warning(
-                f"AirVisual API failure #{self.retry_state['consecutive_failures']}. "
-                f"Next retry in {wait_time//60:.0f} minutes ({wait_time} seconds)"
+                "AirVisual API failure #%d. Next retry in %.0f minutes (%.0f seconds)",
+                self.retry_state['consecutive_failures'], wait_time // 60, wait_time
             )
     
     def new_archive_record(self, event):
         """Inject air quality data into archive records."""
-        if not self.config['enable']:
-            return
-        
         try:
-            # Get latest air quality data (thread-safe)
-            with self.data_lock:
-                air_data = self.latest_data.copy()
+            # Get latest air quality data. Snapshots are immutable and
+            # published by a single reference assignment, so a bare read
+            # is thread-safe.
+            snapshot = self.latest_data
             
-            if air_data:
+            if snapshot is not None:
                 # Check data freshness (don't use stale data)
-                data_age = time.time() - air_data.get('timestamp', 0)
-                max_age = self.config['interval'] * 2  # Allow data up to 2 intervals old
+                data_age = _now() - snapshot.timestamp
                 
-                if data_age <= max_age:
+                if data_age <= self._max_data_age:
                     # Inject fresh air quality data into the archive record
-                    event.record['aqi'] = air_data.get('aqi')
-                    event.record['main_pollutant'] = air_data.get('main_pollutant')
-                    event.record['aqi_level'] = air_data.get('aqi_level')
+                    event.record['aqi'] = snapshot.aqi
+                    event.record['main_pollutant'] = snapshot.main_pollutant
+                    event.record['aqi_level'] = snapshot.aqi_level
                     
                     if self.config['log_success']:
                         log.info(
-                            f"Injected air quality data: AQI={air_data.get('aqi')}, "
-                            f"pollutant={air_data.get('main_pollutant')}, "
-                            f"level={air_data.get('aqi_level')}"
+                            "Injected air quality data: AQI=%s, pollutant=%s, level=%s",
+                            snapshot.aqi, snapshot.main_pollutant, snapshot.aqi_level
                         )
                 else:
                     # Data is too old - don't use it
@@ -487,7 +722,7 @@ class AirVisualService(StdService):
                     event.record['main_pollutant'] = None
                     event.record['aqi_level'] = None
                     
-                    log.debug(f"Air quality data too old ({data_age:.0f}s), not injecting")
+                    log.debug("Air quality data too old (%.0fs), not injecting", data_age)
             else:
                 # No data available - set fields to None (preserves database integrity)
                 event.record['aqi'] = None
@@ -498,7 +733,7 @@ class AirVisualService(StdService):
                 
         except Exception as e:
             if self.config['log_errors']:
-                log.error(f"Error injecting air quality data: {e}")
+                log.error("Error injecting air quality data: %s", e)
             # Always set fields to None on error to prevent WeeWX issues
             event.record['aqi'] = None
             event.record['main_pollutant'] = None
@@ -508,52 +743,79 @@ class AirVisualService(StdService):
         """Clean shutdown of the service."""
         log.info("AirVisual service shutting down")
         
-        # Signal background thread to stop
+        # Signal background collection to stop
         self.shutdown_event.set()
         
-        # Wait for background thread to finish
-        if self.api_thread and self.api_thread.is_alive():
-            self.api_thread.join(timeout=10)
-            if self.api_thread.is_alive():
-                log.warning("Background thread did not shut down cleanly")
+        # Wait for an in-flight collection to finish. The pool's workers are
+        # not daemon threads, so abort a blocked request first rather than
+        # leaving it to hold up interpreter exit until it times out.
+        if self.collection_future is not None:
+            if not self.collection_future.done():
+                self._abort_request()
+            _, pending = wait_futures([self.collection_future], timeout=10)
+            if pending:
+                log.warning("Background collection did not shut down cleanly")
+        
+        # Leave the shared worker pool, stopping it if this was the last user
+        if self.collection_executor is not None:
+            self.collection_executor = None
+            self._release_executor()
+        
+        # Release the persistent API connection
+        self._close_connection()
         
         log.info("AirVisual service shutdown complete")
 
 
+def build_request_path(latitude: float, longitude: float, api_key: str) -> str:
+    """Build the nearest_city request path, including its query string."""
+    params = {
+        'lat': latitude,
+        'lon': longitude,
+        'key': api_key
+    }
+    return f"{API_PATH}?{urlencode(params)}"
+
+
+def _config_file_stamp(config_path: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Return (mtime, size) of the configuration file, or None if unavailable."""
+    if not config_path:
+        return None
+    try:
+        stat = os.stat(config_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def coerce_aqi(value: Any) -> Optional[int]:
+    """Return an API AQI value as a non-negative int, or None if invalid."""
+    # bool is an int subclass but never a valid reading; "not value >= 0"
+    # also rejects NaN
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not value >= 0:
+        return None
+    try:
+        return int(value)
+    except OverflowError:  # infinity
+        return None
+
+
+@functools.lru_cache(maxsize=512)
 def convert_aqi_to_level(aqi: Optional[float]) -> Optional[str]:
     """Convert numeric AQI value to descriptive level."""
     if aqi is None:
         return None
     
-    if aqi <= 50:
-        return "Good"
-    elif aqi <= 100:
-        return "Moderate"
-    elif aqi <= 150:
-        return "Unhealthy for Sensitive Groups"
-    elif aqi <= 200:
-        return "Unhealthy"
-    elif aqi <= 300:
-        return "Very Unhealthy"
-    else:
-        return "Hazardous"
+    return _AQI_LABELS[bisect.bisect_left(_AQI_BREAKPOINTS, aqi)]
 
 
+@functools.lru_cache(maxsize=32)
 def convert_pollutant_code(code: Optional[str]) -> Optional[str]:
     """Convert IQ Air pollutant codes to readable names."""
     if code is None:
         return None
     
-    pollutant_map = {
-        'p2': 'PM2.5',
-        'p1': 'PM10', 
-        'o3': 'Ozone',
-        'n2': 'NO2',
-        's2': 'SO2',
-        'co': 'CO'
-    }
-    
-    return pollutant_map.get(code, code)
+    return _POLLUTANT_MAP.get(code, code)
 
 
 # Test runner for development
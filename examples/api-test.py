@@ -4,8 +4,10 @@
 IQ Air API Test Script
 
 This script tests the IQ Air API connection and response parsing
-independently of WeeWX. Use this to validate your API key and
-understand the current API response format.
+outside of a running WeeWX. Use this to validate your API key and
+understand the current API response format. It reuses the request and
+conversion helpers from bin/user/airvisual.py, so run it with the Python
+interpreter WeeWX uses.
 
 Usage:
     python3 api_test.py YOUR_API_KEY LAT LON
@@ -15,12 +17,26 @@ Example:
 """
 
 import json
+import os
 import sys
 import time
-from urllib.parse import urlencode
 from urllib.request import urlopen, Request
 from urllib.error import URLError, HTTPError
 
+# Use the extension's own request and conversion helpers
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'bin', 'user'))
+
+from airvisual import (
+    API_HOST,
+    API_PATH,
+    REQUEST_HEADERS,
+    VALID_POLLUTANTS,
+    build_request_path,
+    coerce_aqi,
+    convert_aqi_to_level,
+    convert_pollutant_code
+)
+
 def test_api_connection(api_key, latitude, longitude):
     """Test IQ Air API connection and response parsing."""
     
@@ -32,22 +48,14 @@ def test_api_connection(api_key, latitude, longitude):
     print()
     
     # Build API request URL
-    api_url = "http://api.airvisual.com/v2/nearest_city"
-    params = {
-        'lat': latitude,
-        'lon': longitude,
-        'key': api_key
-    }
-    
-    full_url = f"{api_url}?{urlencode(params)}"
+    api_url = f"https://{API_HOST}{API_PATH}"
+    full_url = f"https://{API_HOST}{build_request_path(latitude, longitude, api_key)}"
     print(f"Request URL: {api_url}?lat={latitude}&lon={longitude}&key={api_key[:8]}...")
     print()
     
     try:
         # Create request with proper headers
-        request = Request(full_url)
-        request.add_header('User-Agent', 'WeeWX-AirVisual-Test/1.0')
-        request.add_header('Accept', 'application/json')
+        request = Request(full_url, headers=dict(REQUEST_HEADERS))
         
         print("Making API request...")
         
@@ -112,22 +120,27 @@ def test_api_connection(api_key, latitude, longitude):
             print("❌ Missing 'aqius' field")
             return False
         
-        if not isinstance(aqius, (int, float)) or aqius < 0:
+        # Validate and convert the AQI exactly as the service does
+        aqi = coerce_aqi(aqius)
+        if aqi is None:
             print(f"❌ Invalid AQI value: {aqius}")
             return False
         
         # Validate pollutant code
-        valid_pollutants = ['p2', 'p1', 'o3', 'n2', 's2', 'co']
-        if mainus not in valid_pollutants:
+        if not isinstance(mainus, str):
+            print(f"❌ Invalid pollutant code: {mainus!r}")
+            return False
+        
+        if mainus not in VALID_POLLUTANTS:
             print(f"⚠️ Warning: Unknown pollutant code: {mainus}")
         
         # Convert to WeeWX format
         print()
         print("WEEWX DATA FORMAT:")
         print("-" * 30)
-        print(f"aqi: {int(aqius)}")
+        print(f"aqi: {aqi}")
         print(f"main_pollutant: {convert_pollutant_code(mainus)}")
-        print(f"aqi_level: {convert_aqi_to_level(aqius)}")
+        print(f"aqi_level: {convert_aqi_to_level(aqi)}")
         
         print()
         print("✅ API test completed successfully!")
@@ -158,42 +171,6 @@ def test_api_connection(api_key, latitude, longitude):
         return False
 
 
-def convert_aqi_to_level(aqi):
-    """Convert numeric AQI value to descriptive level."""
-    if aqi is None:
-        return None
-    
-    if aqi <= 50:
-        return "Good"
-    elif aqi <= 100:
-        return "Moderate"
-    elif aqi <= 150:
-        return "Unhealthy for Sensitive Groups"
-    elif aqi <= 200:
-        return "Unhealthy"
-    elif aqi <= 300:
-        return "Very Unhealthy"
-    else:
-        return "Hazardous"
-
-
-def convert_pollutant_code(code):
-    """Convert IQ Air pollutant codes to readable names."""
-    if code is None:
-        return None
-    
-    pollutant_map = {
-        'p2': 'PM2.5',
-        'p1': 'PM10', 
-        'o3': 'Ozone',
-        'n2': 'NO2',
-        's2': 'SO2',
-        'co': 'CO'
-    }
-    
-    return pollutant_map.get(code, code)
-
-
 def main():
     """Main function to run API test."""
     if len(sys.argv) != 4:
@@ -8,23 +8,26 @@ including database schema updates, configuration modifications,
 and service registration with proper database field management.
 
 Key Fix:
-- Uses weectl for REAL/INTEGER fields (supported)
-- Uses direct SQL through WeeWX database manager for VARCHAR fields (weectl limitation)
+- Adds REAL/INTEGER fields through the WeeWX database manager (as weectl does)
+- Uses direct SQL through the same manager for VARCHAR fields (weectl limitation)
 - Ensures proper field types on both SQLite and MariaDB/MySQL
 """
 
 import configobj
 import os
+import re
+import shutil
 import sys
-import subprocess
-import weewx.manager
-import weedb
 
 # WeeWX extension info
 EXTENSION_NAME = 'AirVisual'
 EXTENSION_VERSION = '1.0.0'
 EXTENSION_DESCRIPTION = 'Air quality data from IQ Air AirVisual API'
 
+# Input validation for the interactive prompts
+_API_KEY_RE = re.compile(r'[A-Za-z0-9_-]{10,}$')  # API keys are alphanumeric, may include - and _
+_INT_RE = re.compile(r'\d+$')
+
 def loader():
     return AirVisualInstaller()
 
@@ -74,22 +77,45 @@ class AirVisualInstaller(object):
         print("Checking and extending database schema...")
         
         try:
-            # Get database manager
-            db_binding = config_dict.get('DatabaseTypes', {}).get('archive_mysql', {}).get('binding') or 'wx_binding'
+            # WeeWX's database layer is only needed here, not when loader() runs
+            import weedb
+            import weeutil.weeutil
+            import weewx.manager
             
-            # Check which fields already exist and which need to be added
-            existing_fields, missing_fields = self._check_existing_fields(config_dict, db_binding)
-            
-            if existing_fields:
-                print("\nFields already present in database:")
-                for field in existing_fields:
-                    print(f"  ✓ {field} - already exists, skipping")
+            # Get database binding
+            db_binding = config_dict.get('DatabaseTypes', {}).get('archive_mysql', {}).get('binding') or 'wx_binding'
+            manager_dict = weewx.manager.get_manager_dict_from_config(config_dict, db_binding)
+            table_name = manager_dict['table_name']
             
-            if missing_fields:
-                print("\nAdding missing fields to database:")
-                self._add_missing_fields(config_dict, db_binding, missing_fields)
-            else:
-                print("\n✓ All required fields already exist in database")
+            # One connection serves both the schema check and the additions
+            connection = weedb.connect(manager_dict['database_dict'])
+            try:
+                existing_fields, missing_fields = self._check_existing_fields(
+                    connection, table_name)
+                
+                if existing_fields:
+                    print("\nFields already present in database:")
+                    for field in existing_fields:
+                        print(f"  ✓ {field} - already exists, skipping")
+                
+                if missing_fields:
+                    print("\nAdding missing fields to database:")
+                    # Only now build the manager (and its daily summary setup),
+                    # on the connection that is already open
+                    manager_cls = weeutil.weeutil.get_object(manager_dict['manager'])
+                    dbmanager = manager_cls(connection, table_name)
+                    self._add_missing_fields(dbmanager, missing_fields)
+                    
+                    # Re-read the schema on the still-open connection to
+                    # confirm the additions took
+                    schema_columns = set(connection.columnsOf(table_name))
+                    not_added = [f for f in missing_fields if f not in schema_columns]
+                    if not_added:
+                        raise Exception(f"Fields still missing after schema update: {', '.join(not_added)}")
+                else:
+                    print("\n✓ All required fields already exist in database")
+            finally:
+                connection.close()
             
             # Add unit system mappings (always safe to do)
             self._setup_unit_system()
@@ -97,152 +123,110 @@ class AirVisualInstaller(object):
             print("\n✓ Database schema management completed successfully")
             
         except Exception as e:
+            weectl = self._find_weectl() or 'weectl'
             print(f"\n❌ Error during database schema management: {e}")
             print("Installation will continue, but you may need to manually add database fields:")
             print("Manual commands for MariaDB/MySQL:")
-            print("   mysql -u weewx -p weewx -e \"ALTER TABLE archive ADD COLUMN aqi DOUBLE;\"")
-            print("   mysql -u weewx -p weewx -e \"ALTER TABLE archive ADD COLUMN main_pollutant VARCHAR(10);\"")
-            print("   mysql -u weewx -p weewx -e \"ALTER TABLE archive ADD COLUMN aqi_level VARCHAR(30);\"")
+            print("   mysql -u weewx -p weewx -e \"ALTER TABLE archive ADD COLUMN aqi DOUBLE, "
+                  "ADD COLUMN main_pollutant VARCHAR(10), ADD COLUMN aqi_level VARCHAR(30);\"")
             print("Manual commands for SQLite:")
-            print("   weectl database add-column aqi --type 'REAL'")
-            print("   weectl database add-column main_pollutant --type 'TEXT'")
-            print("   weectl database add-column aqi_level --type 'TEXT'")
+            print(f"   {weectl} database add-column aqi --type 'REAL'")
+            print(f"   {weectl} database add-column main_pollutant --type 'TEXT'")
+            print(f"   {weectl} database add-column aqi_level --type 'TEXT'")
     
-    def _check_existing_fields(self, config_dict, db_binding):
-        """Check which required fields already exist in the database."""
-        existing_fields = []
-        missing_fields = []
+    def _check_existing_fields(self, connection, table_name):
+        """Check which required fields already exist in the database.
         
+        Returns (existing_fields, missing_fields).
+        """
         try:
-            # Open database manager to check schema
-            with weewx.manager.open_manager_with_config(config_dict, db_binding) as dbmanager:
-                # Get current schema
-                schema_columns = []
-                for column in dbmanager.connection.genSchemaOf('archive'):
-                    schema_columns.append(column[1])  # column[1] is the column name
-                
-                # Check each required field
-                for field_name in self.required_fields:
-                    if field_name in schema_columns:
-                        existing_fields.append(field_name)
-                    else:
-                        missing_fields.append(field_name)
-                        
+            # Read the schema once for both lists
+            schema_columns = frozenset(connection.columnsOf(table_name))
         except Exception as e:
             print(f"Warning: Could not check database schema: {e}")
             # Assume all fields are missing if we can't check
-            missing_fields = list(self.required_fields.keys())
+            schema_columns = frozenset()
         
+        existing_fields = [f for f in self.required_fields if f in schema_columns]
+        missing_fields = [f for f in self.required_fields if f not in schema_columns]
         return existing_fields, missing_fields
     
-    def _add_missing_fields(self, config_dict, db_binding, missing_fields):
-        """Add missing fields using appropriate method for each field type."""
-        
-        # Find weectl executable
-        weectl_path = self._find_weectl()
-        if not weectl_path:
-            print("  weectl not found - using direct SQL for all fields")
-            # Fall back to direct SQL for all fields
-            for field_name in missing_fields:
-                field_type = self.required_fields[field_name]
-                self._add_field_direct_sql(config_dict, db_binding, field_name, field_type)
-            return
+    def _add_missing_fields(self, dbmanager, missing_fields):
+        """Add missing fields through the open database manager.
         
-        # Get config file path
-        config_path = getattr(config_dict, 'filename', '/etc/weewx/weewx.conf')
+        Numeric fields go through the manager's own add_column(), the same
+        call weectl makes, so they also get a daily summary table. Text
+        fields cannot be summarized and are added with plain DDL.
+        """
+        text_fields = []
         
         for field_name in missing_fields:
             field_type = self.required_fields[field_name]
-            
             print(f"  Adding field '{field_name}' ({field_type})...")
             
-            # Use weectl for supported types, direct SQL for VARCHAR
-            if field_type in ['REAL', 'INTEGER', 'real', 'integer', 'int']:
-                # Use weectl for numeric types (confirmed supported)
-                self._add_field_with_weectl(weectl_path, config_path, db_binding, field_name, field_type)
-            else:
-                # Use direct SQL for VARCHAR/TEXT types (weectl limitation workaround)
-                print(f"    Using direct SQL (weectl doesn't support VARCHAR)")
-                self._add_field_direct_sql(config_dict, db_binding, field_name, field_type)
-    
-    def _add_field_with_weectl(self, weectl_path, config_path, db_binding, field_name, field_type):
-        """Add field using weectl database add-column command."""
-        try:
-            # Build weectl command for supported field types
-            cmd = [
-                weectl_path, 'database', 'add-column', field_name,
-                '--type', field_type,
-                '--config', config_path,
-                '--binding', db_binding,
-                '-y'  # Don't prompt for confirmation
-            ]
-            
-            # Run weectl database add-column command
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            
-            if result.returncode == 0:
-                print(f"    ✓ Successfully added '{field_name}' using weectl")
-            else:
-                # Check if error is due to field already existing
-                if 'duplicate column' in result.stderr.lower() or 'already exists' in result.stderr.lower():
+            if field_type.lower() in ('real', 'integer', 'int'):
+                try:
+                    dbmanager.add_column(field_name, field_type)
+                    print(f"    ✓ Successfully added '{field_name}'")
+                except Exception as e:
+                    if not self._is_duplicate_column_error(e):
+                        print(f"    ❌ Failed to add '{field_name}': {e}")
+                        raise Exception(f"Field creation failed: {e}")
                     print(f"    ✓ Field '{field_name}' already exists")
-                else:
-                    print(f"    ❌ weectl failed: {result.stderr.strip()}")
-                    # Fall back to direct SQL
-                    print(f"    Trying direct SQL fallback...")
-                    field_type_sql = 'DOUBLE' if field_type == 'REAL' else field_type
-                    self._add_field_direct_sql_by_binding(db_binding, field_name, field_type_sql)
-                    
-        except subprocess.TimeoutExpired:
-            print(f"    ❌ Timeout adding field '{field_name}' with weectl")
-            raise Exception(f"weectl command timed out")
-        except Exception as e:
-            print(f"    ❌ Error with weectl: {e}")
-            raise Exception(f"weectl command failed: {e}")
-    
-    def _add_field_direct_sql(self, config_dict, db_binding, field_name, field_type):
-        """Add field using direct SQL through WeeWX database manager."""
-        try:
-            with weewx.manager.open_manager_with_config(config_dict, db_binding) as dbmanager:
-                # Use generic SQL compatible with both SQLite and MySQL
-                sql = f"ALTER TABLE archive ADD COLUMN {field_name} {field_type}"
-                dbmanager.connection.execute(sql)
-                print(f"    ✓ Successfully added '{field_name}' using direct SQL")
-        except Exception as e:
-            error_msg = str(e).lower()
-            if 'duplicate column' in error_msg or 'already exists' in error_msg:
-                print(f"    ✓ Field '{field_name}' already exists")
             else:
-                print(f"    ❌ Failed to add '{field_name}': {e}")
-                raise Exception(f"Direct SQL field creation failed: {e}")
+                text_fields.append(field_name)
+        
+        if text_fields:
+            self._add_fields_direct_sql(dbmanager, text_fields)
     
-    def _find_weectl(self):
-        """Find the weectl executable."""
-        # Common locations for weectl
-        possible_paths = [
-            '/usr/bin/weectl',
-            '/usr/local/bin/weectl', 
-            os.path.expanduser('~/weewx-data/bin/weectl'),
-            'weectl'  # In PATH
-        ]
+    def _add_fields_direct_sql(self, dbmanager, field_names):
+        """Add fields using direct SQL, batched into one ALTER TABLE where the database allows it."""
+        import weedb
         
-        for path in possible_paths:
-            try:
-                result = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=10)
-                if result.returncode == 0:
-                    return path
-            except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
-                continue
+        table = dbmanager.table_name
+        columns = [f"ADD COLUMN {name} {self.required_fields[name]}" for name in field_names]
         
-        # Try to find it in PATH
-        try:
-            result = subprocess.run(['which', 'weectl'], capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                return result.stdout.strip()
-        except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
-            pass
+        # MySQL/MariaDB take several ADD COLUMN clauses in one statement;
+        # SQLite only ever accepts one per ALTER TABLE.
+        if len(columns) > 1 and dbmanager.connection.dbtype == 'mysql':
+            try:
+                with weedb.Transaction(dbmanager.connection) as cursor:
+                    cursor.execute(f"ALTER TABLE {table} " + ", ".join(columns))
+                for field_name in field_names:
+                    print(f"    ✓ Successfully added '{field_name}' using direct SQL")
+                return
+            except Exception as e:
+                if not self._is_duplicate_column_error(e):
+                    print(f"    ❌ Failed to add {', '.join(field_names)}: {e}")
+                    raise Exception(f"Direct SQL field creation failed: {e}")
+                # Some already exist; add the rest one at a time below
         
-        return None
+        with weedb.Transaction(dbmanager.connection) as cursor:
+            for field_name, column in zip(field_names, columns):
+                try:
+                    cursor.execute(f"ALTER TABLE {table} {column}")
+                    print(f"    ✓ Successfully added '{field_name}' using direct SQL")
+                except Exception as e:
+                    if not self._is_duplicate_column_error(e):
+                        print(f"    ❌ Failed to add '{field_name}': {e}")
+                        raise Exception(f"Direct SQL field creation failed: {e}")
+                    print(f"    ✓ Field '{field_name}' already exists")
+    
+    @staticmethod
+    def _is_duplicate_column_error(error):
+        """Return True if a database error means the column is already there."""
+        error_msg = str(error).lower()
+        return 'duplicate column' in error_msg or 'already exists' in error_msg
+    
+    def _find_weectl(self):
+        """Find the weectl executable without running it."""
+        # PATH first, then the common install locations
+        return shutil.which('weectl') or next(
+            (path for path in ('/usr/bin/weectl',
+                               '/usr/local/bin/weectl',
+                               os.path.expanduser('~/weewx-data/bin/weectl'))
+             if os.path.isfile(path) and os.access(path, os.X_OK)),
+            None)
     
     def _setup_unit_system(self):
         """Setup unit system mappings for AQI fields."""
@@ -315,15 +299,17 @@ class AirVisualInstaller(object):
         services = config_dict['Engine']['Services']
         current_data_services = services.get('data_services', '')
         
-        # Convert to list for manipulation
+        # Parse into an ordered, de-duplicated mapping (whitespace-insensitive)
         if isinstance(current_data_services, str):
-            data_services_list = [s.strip() for s in current_data_services.split(',') if s.strip()]
-        else:
-            data_services_list = list(current_data_services) if current_data_services else []
+            current_data_services = current_data_services.split(',')
+        raw_services = [s.strip() for s in current_data_services or [] if s.strip()]
+        data_services = dict.fromkeys(raw_services)
         
         # Add our service if not already present
         airvisual_service = 'user.airvisual.AirVisualService'
-        if airvisual_service not in data_services_list:
+        if airvisual_service not in data_services:
+            data_services_list = list(data_services)
+            
             # Insert after StdConvert but before StdQC for proper data flow
             insert_position = len(data_services_list)  # Default to end
             for i, service in enumerate(data_services_list):
@@ -340,6 +326,9 @@ class AirVisualInstaller(object):
             services['data_services'] = ', '.join(data_services_list)
             print(f"  ✓ Added {airvisual_service} to data_services")
         else:
+            if len(data_services) != len(raw_services):
+                # Drop duplicate registrations left by earlier installs
+                services['data_services'] = ', '.join(data_services)
             print(f"  ✓ {airvisual_service} already registered")
     
     def _prompt_for_api_key(self):
@@ -356,7 +345,7 @@ class AirVisualInstaller(object):
             api_key = input("Enter your IQ Air API key: ").strip()
             if api_key:
                 # Basic validation - API keys are typically alphanumeric
-                if len(api_key) >= 10 and api_key.replace('-', '').replace('_', '').isalnum():
+                if _API_KEY_RE.match(api_key):
                     confirm = input(f"Confirm API key '{api_key}'? (y/n): ").strip().lower()
                     if confirm in ['y', 'yes']:
                         return api_key
@@ -378,26 +367,25 @@ class AirVisualInstaller(object):
         print()
         
         while True:
-            try:
-                minutes = input("Enter interval in minutes [10]: ").strip()
-                if not minutes:
-                    minutes = "10"
-                
-                interval_minutes = int(minutes)
-                if interval_minutes < 5:
-                    print("Minimum interval is 5 minutes to respect API rate limits.")
-                    continue
-                elif interval_minutes < 10:
-                    confirm = input(f"Warning: {interval_minutes} minutes may use API quota quickly. Continue? (y/n): ")
-                    if confirm.strip().lower() not in ['y', 'yes']:
-                        continue
-                
-                interval_seconds = interval_minutes * 60
-                return interval_seconds
-                
-            except ValueError:
+            minutes = input("Enter interval in minutes [10]: ").strip()
+            if not minutes:
+                minutes = "10"
+            
+            if not _INT_RE.match(minutes):
                 print("Please enter a valid number of minutes.")
-
+                continue
+            
+            interval_minutes = int(minutes)
+            if interval_minutes < 5:
+                print("Minimum interval is 5 minutes to respect API rate limits.")
+                continue
+            elif interval_minutes < 10:
+                confirm = input(f"Warning: {interval_minutes} minutes may use API quota quickly. Continue? (y/n): ")
+                if confirm.strip().lower() not in ['y', 'yes']:
+                    continue
+            
+            interval_seconds = interval_minutes * 60
+            return interval_seconds
 
 def main():
     """Command line installer for testing."""
@@ -12,14 +12,25 @@ if [ ! -f "bin/user/airvisual.py" ]; then
     exit 1
 fi
 
+# --fast skips tests marked slow (real threads and worker pools)
+PYTEST_ARGS=(tests/ -v)
+if [ "$1" = "--fast" ]; then
+    PYTEST_ARGS+=(-m "not slow")
+    shift
+fi
+
 # Run unit tests
 echo "Running unit tests..."
-if command -v pytest &> /dev/null; then
-    echo "Using pytest..."
-    python3 -m pytest tests/test_airvisual.py -v
+if ! python3 -c "import pytest" &> /dev/null; then
+    echo "❌ Error: pytest is required. Install it with: pip install pytest"
+    exit 1
+fi
+if python3 -c "import xdist" &> /dev/null; then
+    echo "Using pytest with pytest-xdist..."
+    python3 -m pytest -n auto "${PYTEST_ARGS[@]}"
 else
-    echo "Using unittest..."
-    python3 tests/test_airvisual.py
+    echo "Using pytest..."
+    python3 -m pytest "${PYTEST_ARGS[@]}"
 fi
 
 # Run API test if API key provided
@@ -30,7 +41,7 @@ if [ $# -eq 3 ]; then
 else
     echo
     echo "To run API integration test:"
-    echo "  ./scripts/run_tests.sh YOUR_API_KEY LATITUDE LONGITUDE"
+    echo "  ./scripts/run_tests.sh [--fast] YOUR_API_KEY LATITUDE LONGITUDE"
     echo "  Example: ./scripts/run_tests.sh abc123 33.656915 -117.982542"
 fi
 
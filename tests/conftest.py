@@ -0,0 +1,101 @@
+"""
+Shared pytest fixtures for the AirVisual extension tests.
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+# Add the parent directory to sys.path to import airvisual module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'bin', 'user'))
+# ...and the repository root for the installer
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# ...and this directory for the shared test helpers, whatever the import mode
+sys.path.insert(0, os.path.dirname(__file__))
+
+import airvisual
+from helpers import make_cfg
+
+
+def pytest_configure(config):
+    """Register the suite's custom markers."""
+    config.addinivalue_line(
+        "markers", "slow: uses real threads or worker pools (deselect with -m 'not slow')"
+    )
+
+
+def _build_service(config_dict):
+    """Build a service without starting collection."""
+    engine = SimpleNamespace(config_dict=config_dict, bind=lambda event, callback: None)
+    with patch.object(airvisual.AirVisualService, '_start_collection'):
+        return airvisual.AirVisualService(engine, config_dict)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def quiet_log():
+    """Replace the module logger for the whole test session."""
+    with patch('airvisual.log') as mock_log:
+        yield mock_log
+
+
+@pytest.fixture(scope="session")
+def base_cfg():
+    """The baseline configuration. Treat as read-only."""
+    return make_cfg(enable=False)  # Don't start background collection
+
+
+@pytest.fixture(scope="session")
+def enabled_cfg():
+    """The baseline configuration with the service enabled."""
+    return make_cfg()
+
+
+@pytest.fixture(scope="session")
+def retry_cfg():
+    """An enabled configuration with short retry waits."""
+    return make_cfg(
+        retry_wait_base=60,  # Shorter for testing
+        retry_wait_max=300,  # Shorter for testing
+        retry_multiplier=2.0,
+        log_errors=False  # Reduce test noise
+    )
+
+
+@pytest.fixture(scope="class")
+def disabled_service(base_cfg):
+    """One disabled service shared by a test class."""
+    return _build_service(base_cfg)
+
+
+@pytest.fixture(scope="class")
+def enabled_service(enabled_cfg):
+    """One enabled service shared by a test class."""
+    return _build_service(enabled_cfg)
+
+
+@pytest.fixture(scope="class")
+def retry_service(retry_cfg):
+    """One enabled service with short retry waits shared by a test class."""
+    return _build_service(retry_cfg)
+
+
+_SHARED_SERVICES = ('disabled_service', 'enabled_service', 'retry_service')
+
+
+@pytest.fixture(autouse=True)
+def restore_shared_service(request):
+    """Restore the retry state and latest data of any shared service after each test.
+    
+    The class-scoped services are shared by every test in a class; this
+    keeps tests that change them independent.
+    """
+    services = [request.getfixturevalue(name)
+                for name in _SHARED_SERVICES if name in request.fixturenames]
+    saved = [(service.retry_state.copy(), service.latest_data) for service in services]
+    yield
+    for service, (retry_state, latest_data) in zip(services, saved):
+        service.retry_state = retry_state
+        service.latest_data = latest_data
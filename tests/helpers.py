@@ -0,0 +1,25 @@
+"""
+Helpers shared by the AirVisual extension tests.
+
+Test modules import these directly; conftest.py puts this directory on
+sys.path.
+"""
+
+
+def make_cfg(*, lat=33.656915, lon=-117.982542, api_key='test_key', enable=True, **service_overrides):
+    """Build a fresh configuration dict with the given overrides.
+    
+    This is the one baseline configuration for the suite. Every call
+    returns new nested sections, so tests can change keys without
+    affecting each other.
+    """
+    return {
+        'Station': {'latitude': lat, 'longitude': lon},
+        'AirVisualService': {
+            'enable': enable,
+            'api_key': api_key,
+            'interval': 600,
+            'timeout': 30,
+            **service_overrides
+        }
+    }
@@ -10,27 +10,114 @@ This test suite validates the AirVisual service functionality including:
 - Configuration handling
 - Database integration
 
-Run with: python3 -m pytest test_airvisual.py -v
-Or: python3 test_airvisual.py
+Run with: python3 -m pytest tests/ -v
+In parallel (with pytest-xdist): python3 -m pytest -n auto tests/
 """
 
+import copy
+from contextlib import nullcontext
+import http.client
 import json
 import unittest
 import threading
 import time
-from unittest.mock import Mock, patch, MagicMock
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import Mock, patch
 import tempfile
 import os
-import sys
 
-# Add the parent directory to sys.path to import airvisual module
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'bin', 'user'))
+import pytest
 
-try:
-    import airvisual
-except ImportError:
-    print("❌ Cannot import airvisual module. Ensure bin/user/airvisual.py exists.")
-    sys.exit(1)
+import airvisual  # Importable via the bin/user path set up in conftest.py
+from helpers import make_cfg  # Importable via the tests path set up in conftest.py
+
+
+def _frozen(value):
+    """Recursively wrap dicts in read-only mappings."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _frozen(item) for key, item in value.items()})
+    return value
+
+
+# API response payloads, built once. They are read-only so a parser that
+# modifies its input fails loudly.
+_VALID_RESPONSE = _frozen({
+    "status": "success",
+    "data": {
+        "city": "Huntington Beach",
+        "state": "California",
+        "country": "USA",
+        "current": {
+            "pollution": {
+                "ts": "2025-01-07T12:00:00.000Z",
+                "aqius": 42,
+                "mainus": "p2"
+            }
+        }
+    }
+})
+
+_MALFORMED_RESPONSES = {
+    name: _frozen(response)
+    for name, response in (
+        ('error-status', {"status": "error", "data": "Invalid API key"}),
+        ('missing-pollution', {
+            "status": "success",
+            "data": {"city": "Test City", "current": {}}
+        }),
+        ('missing-data', {"status": "success"}),
+        ('data-not-object', {"status": "success", "data": "unexpected"}),
+        ('missing-mainus', {"status": "success", "data": {"current": {"pollution": {"aqius": 42}}}})
+    )
+}
+
+_INVALID_AQI_RESPONSES = {
+    name: _frozen({"status": "success", "data": {"current": {"pollution": pollution}}})
+    for name, pollution in (
+        ('missing', {"mainus": "p2"}),
+        ('negative', {"aqius": -5, "mainus": "p2"}),
+        ('non-numeric', {"aqius": "invalid", "mainus": "p2"}),
+        ('nan', {"aqius": float('nan'), "mainus": "p2"}),
+        ('inf', {"aqius": float('inf'), "mainus": "p2"}),
+        ('bool', {"aqius": True, "mainus": "p2"})
+    )
+}
+
+# Raw body of a successful API response
+_RESPONSE_BODY = json.dumps({
+    "status": "success",
+    "data": {
+        "current": {
+            "pollution": {"aqius": 42, "mainus": "p2"}
+        }
+    }
+}).encode('utf-8')
+
+
+class ServiceTemplateTestCase(unittest.TestCase):
+    """Base class for tests that each need their own service instance.
+    
+    Subclasses set config_dict. One service is built per class and each
+    test gets a shallow copy with fresh locks, events and retry state, which
+    is much cheaper than running the constructor again.
+    """
+    
+    config_dict = None
+    
+    @classmethod
+    def setUpClass(cls):
+        """Build the template service once for the whole class."""
+        super().setUpClass()
+        cls.engine = SimpleNamespace(config_dict=cls.config_dict)
+        cls._template = airvisual.AirVisualService(cls.engine, cls.config_dict)
+    
+    def new_service(self):
+        """Return a copy of the template that shares no mutable state with it."""
+        service = copy.copy(self._template)
+        service.data_lock = threading.Lock()
+        service.shutdown_event = threading.Event()
+        service.retry_state = dict(self._template.retry_state)
+        return service
 
 
 class TestAirVisualService(unittest.TestCase):
@@ -38,564 +125,703 @@ class TestAirVisualService(unittest.TestCase):
     
     def setUp(self):
         """Set up test fixtures."""
+        # Don't poll the live API from background collection
+        start_patcher = patch.object(airvisual.AirVisualService, '_start_collection')
+        start_patcher.start()
+        self.addCleanup(start_patcher.stop)
+        
         self.mock_engine = Mock()
-        self.mock_engine.config_dict = {
-            'Station': {
-                'latitude': 33.656915,
-                'longitude': -117.982542
-            },
-            'AirVisualService': {
-                'enable': True,
-                'api_key': 'test_api_key_123',
-                'interval': 600,
-                'timeout': 30,
-                'log_success': False,
-                'log_errors': True,
-                'retry_wait_base': 600,
-                'retry_wait_max': 21600,
-                'retry_multiplier': 2.0
-            }
-        }
+        self.mock_engine.config_dict = make_cfg(
+            api_key='test_api_key_123',
+            log_success=False,
+            log_errors=True,
+            retry_wait_base=600,
+            retry_wait_max=21600,
+            retry_multiplier=2.0
+        )
     
     def test_configuration_parsing(self):
         """Test configuration parsing from weewx.conf."""
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
-            
-            # Verify configuration was parsed correctly
-            self.assertEqual(service.config['api_key'], 'test_api_key_123')
-            self.assertEqual(service.config['latitude'], 33.656915)
-            self.assertEqual(service.config['longitude'], -117.982542)
-            self.assertEqual(service.config['interval'], 600)
-            self.assertTrue(service.config['enable'])
-    
-    def test_configuration_validation(self):
-        """Test configuration validation."""
-        # Test missing API key
-        invalid_config = self.mock_engine.config_dict.copy()
-        invalid_config['AirVisualService']['api_key'] = ''
-        
-        with patch('airvisual.log'), \
-             self.assertRaises(Exception):  # Should raise ViolatedPrecondition
-            airvisual.AirVisualService(self.mock_engine, invalid_config)
-    
-    def test_coordinate_validation(self):
-        """Test coordinate validation."""
-        # Test invalid latitude
-        invalid_config = self.mock_engine.config_dict.copy()
-        invalid_config['Station']['latitude'] = 91.0  # Invalid latitude
-        
-        with patch('airvisual.log'), \
-             self.assertRaises(Exception):
-            airvisual.AirVisualService(self.mock_engine, invalid_config)
-        
-        # Test invalid longitude
-        invalid_config = self.mock_engine.config_dict.copy()
-        invalid_config['Station']['longitude'] = 181.0  # Invalid longitude
-        
-        with patch('airvisual.log'), \
-             self.assertRaises(Exception):
-            airvisual.AirVisualService(self.mock_engine, invalid_config)
+        service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
+            
+        # Verify configuration was parsed correctly
+        self.assertEqual(service.config['api_key'], 'test_api_key_123')
+        self.assertEqual(service.config['latitude'], 33.656915)
+        self.assertEqual(service.config['longitude'], -117.982542)
+        self.assertEqual(service.config['interval'], 600)
+        self.assertTrue(service.config['enable'])
     
     def test_disabled_service(self):
         """Test service when disabled in configuration."""
-        disabled_config = self.mock_engine.config_dict.copy()
-        disabled_config['AirVisualService']['enable'] = False
+        service = airvisual.AirVisualService(self.mock_engine, make_cfg(enable=False))
         
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, disabled_config)
-            
-            # Service should not start background thread when disabled
-            self.assertIsNone(service.api_thread)
+        # Service should not start background collection when disabled
+        self.assertIsNone(service.collection_executor)
+            
+        # Service should not bind to WeeWX events when disabled
+        self.mock_engine.bind.assert_not_called()
+    
+    def test_enabled_service_binds_events(self):
+        """Test that an enabled service binds to loop packet and archive record events."""
+        service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
+            
+        self.assertEqual(self.mock_engine.bind.call_count, 2)
+        self.mock_engine.bind.assert_any_call(
+            airvisual.weewx.NEW_LOOP_PACKET, service.new_loop_packet
+        )
+        self.mock_engine.bind.assert_any_call(
+            airvisual.weewx.NEW_ARCHIVE_RECORD, service.new_archive_record
+        )
 
 
-class TestAPIResponseParsing(unittest.TestCase):
-    """Test API response parsing and validation."""
+class TestConfigurationValidation:
+    """Test which configurations the service rejects at startup."""
+    
+    @pytest.fixture(autouse=True)
+    def no_collection(self, monkeypatch):
+        """Keep background collection from starting."""
+        monkeypatch.setattr(airvisual.AirVisualService, '_start_collection', Mock())
+    
+    @pytest.mark.parametrize("overrides,should_raise", [
+        ({}, False),
+        ({'api_key': ''}, True),
+        ({'lat': 91.0}, True),
+        ({'lon': 181.0}, True),
+        ({'lat': 0.0, 'lon': 0.0}, True),
+        ({'api_key': '', 'enable': False}, False),
+    ], ids=['valid', 'missing-api-key', 'bad-latitude', 'bad-longitude',
+            'unset-coordinates', 'disabled-skips-checks'])
+    def test_config_variant(self, overrides, should_raise):
+        """Test that invalid settings raise ViolatedPrecondition."""
+        config_dict = make_cfg(**overrides)
+        engine = SimpleNamespace(config_dict=config_dict, bind=lambda event, callback: None)
+        expectation = pytest.raises(airvisual.weewx.ViolatedPrecondition) if should_raise else nullcontext()
+        with expectation:
+            airvisual.AirVisualService(engine, config_dict)
+
+
+class TestConfigurationCache(unittest.TestCase):
+    """Test caching of parsed configuration across service reloads."""
+    
+    class ConfigDict(dict):
+        """Dict carrying a source filename, like ConfigObj."""
+        filename = None
     
     def setUp(self):
         """Set up test fixtures."""
-        self.mock_engine = Mock()
-        self.mock_engine.config_dict = {
-            'Station': {'latitude': 33.656915, 'longitude': -117.982542},
-            'AirVisualService': {
-                'enable': True,
-                'api_key': 'test_key',
-                'interval': 600,
-                'timeout': 30,
-                'log_success': False,
-                'log_errors': True
-            }
-        }
-    
-    def test_valid_api_response(self):
-        """Test parsing of valid API response."""
-        valid_response = {
-            "status": "success",
-            "data": {
-                "city": "Huntington Beach",
-                "state": "California",
-                "country": "USA",
-                "current": {
-                    "pollution": {
-                        "ts": "2025-01-07T12:00:00.000Z",
-                        "aqius": 42,
-                        "mainus": "p2"
-                    }
-                }
-            }
-        }
+        airvisual._CONFIG_CACHE.clear()
         
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
-            result = service._parse_api_response(valid_response)
-            
-            self.assertIsNotNone(result)
-            self.assertEqual(result['aqi'], 42)
-            self.assertEqual(result['main_pollutant'], 'PM2.5')
-            self.assertEqual(result['aqi_level'], 'Good')
-    
-    def test_invalid_api_response_status(self):
-        """Test parsing of API response with error status."""
-        error_response = {
-            "status": "error",
-            "data": "Invalid API key"
-        }
+        config_file = tempfile.NamedTemporaryFile('w', suffix='.conf', delete=False)
+        config_file.write('# weewx.conf\n')
+        config_file.close()
+        self.addCleanup(os.unlink, config_file.name)
+        self.addCleanup(airvisual._CONFIG_CACHE.clear)
+        
+        self.config_dict = self.ConfigDict(make_cfg(enable=False))  # Don't start background collection
+        self.config_dict.filename = config_file.name
+        self.engine = SimpleNamespace(config_dict=self.config_dict)
+    
+    def test_unchanged_config_not_reparsed(self):
+        """Test that an unchanged weewx.conf reuses the cached configuration."""
+        first = airvisual.AirVisualService(self.engine, self.config_dict)
+            
+        with patch.object(airvisual.AirVisualService, '_parse_config') as mock_parse:
+            second = airvisual.AirVisualService(self.engine, self.config_dict)
+            mock_parse.assert_not_called()
+            
+        self.assertEqual(first.config, second.config)
+        self.assertIsNot(first.config, second.config)
+    
+    def test_changed_config_reparsed(self):
+        """Test that a modified weewx.conf is parsed again."""
+        airvisual.AirVisualService(self.engine, self.config_dict)
+            
+        with open(self.config_dict.filename, 'a') as f:
+            f.write('# edited\n')
+        self.config_dict['AirVisualService']['interval'] = 900
+            
+        service = airvisual.AirVisualService(self.engine, self.config_dict)
+        self.assertEqual(service.config['interval'], 900)
+    
+    def test_cached_config_still_logged(self):
+        """Test that a cache hit still logs the configuration and its warnings."""
+        config_dict = self.ConfigDict(make_cfg(interval=120))
+        config_dict.filename = self.config_dict.filename
+        engine = SimpleNamespace(config_dict=config_dict, bind=lambda event, callback: None)
         
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
-            result = service._parse_api_response(error_response)
+        with patch.object(airvisual.AirVisualService, '_start_collection'):
+            airvisual.AirVisualService(engine, config_dict)
             
-            self.assertIsNone(result)
+            with patch.object(airvisual.AirVisualService, '_parse_config') as mock_parse, \
+                 patch('airvisual.log') as mock_log:
+                airvisual.AirVisualService(engine, config_dict)
+        
+        mock_parse.assert_not_called()
+        mock_log.warning.assert_called_once()
+        self.assertIn("AirVisual service configured: lat=%s, lon=%s, interval=%ss",
+                      [call.args[0] for call in mock_log.info.call_args_list])
+    
+    def test_config_without_file_not_cached(self):
+        """Test that configurations without a source file are not cached."""
+        airvisual.AirVisualService(self.engine, dict(self.config_dict))
+        self.assertEqual(airvisual._CONFIG_CACHE, {})
+
+
+class TestAPIResponseParsing:
+    """Test API response parsing and validation."""
     
-    def test_missing_pollution_data(self):
-        """Test parsing of response missing pollution data."""
-        incomplete_response = {
-            "status": "success",
-            "data": {
-                "city": "Test City",
-                "current": {}  # Missing pollution data
-            }
-        }
+    def test_valid_api_response(self, enabled_service):
+        """Test parsing of valid API response."""
+        result = enabled_service._parse_api_response(_VALID_RESPONSE)
         
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
-            result = service._parse_api_response(incomplete_response)
-            
-            self.assertIsNone(result)
-    
-    def test_invalid_aqi_values(self):
-        """Test parsing of response with invalid AQI values."""
-        invalid_responses = [
-            # Missing aqius
-            {
-                "status": "success",
-                "data": {
-                    "current": {
-                        "pollution": {
-                            "mainus": "p2"
-                        }
-                    }
-                }
-            },
-            # Negative AQI
-            {
-                "status": "success",
-                "data": {
-                    "current": {
-                        "pollution": {
-                            "aqius": -5,
-                            "mainus": "p2"
-                        }
-                    }
-                }
-            },
-            # Non-numeric AQI
-            {
-                "status": "success",
-                "data": {
-                    "current": {
-                        "pollution": {
-                            "aqius": "invalid",
-                            "mainus": "p2"
-                        }
-                    }
-                }
-            }
-        ]
+        assert result is not None
+        assert (result.aqi, result.main_pollutant, result.aqi_level) == (42, 'PM2.5', 'Good')
+    
+    def test_fractional_aqi_truncated_before_level(self, enabled_service):
+        """Test that the level is looked up from the stored, truncated AQI."""
+        result = enabled_service._parse_api_response(
+            {"status": "success", "data": {"current": {"pollution": {"aqius": 50.7, "mainus": "p2"}}}}
+        )
         
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
-            
-            for response in invalid_responses:
-                result = service._parse_api_response(response)
-                self.assertIsNone(result, f"Should reject invalid response: {response}")
+        # 50.7 would be "Moderate"; the stored 50 is "Good"
+        assert (result.aqi, result.main_pollutant, result.aqi_level) == (50, 'PM2.5', 'Good')
+    
+    @pytest.mark.parametrize("response", list(_MALFORMED_RESPONSES.values()),
+                             ids=list(_MALFORMED_RESPONSES))
+    def test_malformed_api_response(self, enabled_service, response):
+        """Test that error, incomplete and mistyped responses are rejected."""
+        assert enabled_service._parse_api_response(response) is None
 
 
-class TestRetryLogic(unittest.TestCase):
-    """Test exponential backoff retry logic."""
+class TestInvalidAQIValues:
+    """Test parsing of responses with invalid AQI values."""
+    
+    @pytest.mark.parametrize("response", list(_INVALID_AQI_RESPONSES.values()),
+                             ids=list(_INVALID_AQI_RESPONSES))
+    def test_invalid_aqi_values(self, enabled_service, response):
+        """Test that a response with an unusable AQI is rejected."""
+        assert enabled_service._parse_api_response(response) is None
+
+
+class TestHTTPClient(ServiceTemplateTestCase):
+    """Test the persistent HTTP connection handling."""
+    
+    config_dict = make_cfg(enable=False, log_errors=False)  # Don't start background collection
     
     def setUp(self):
         """Set up test fixtures."""
-        self.mock_engine = Mock()
-        self.mock_engine.config_dict = {
-            'Station': {'latitude': 33.656915, 'longitude': -117.982542},
-            'AirVisualService': {
-                'enable': True,
-                'api_key': 'test_key',
-                'interval': 600,
-                'timeout': 30,
-                'retry_wait_base': 60,  # Shorter for testing
-                'retry_wait_max': 300,  # Shorter for testing
-                'retry_multiplier': 2.0,
-                'log_errors': False  # Reduce test noise
-            }
-        }
+        self.response_body = _RESPONSE_BODY
+    
+    def _mock_response(self, status=200, will_close=False, headers=None):
+        """Build a mock HTTP response."""
+        headers = headers or {}
+        response = Mock()
+        response.status = status
+        response.will_close = will_close
+        response.read.return_value = self.response_body
+        response.getheader.side_effect = lambda name, default=None: headers.get(name, default)
+        return response
+    
+    def test_connection_reused_across_polls(self):
+        """Test that one connection is reused for successive polls."""
+        with patch('airvisual.http.client.HTTPSConnection') as mock_conn_class:
+            mock_conn_class.return_value.getresponse.return_value = self._mock_response()
+            service = self.new_service()
+            
+            self.assertTrue(service._collect_air_quality_data())
+            self.assertTrue(service._collect_air_quality_data())
+            
+            self.assertEqual(mock_conn_class.call_count, 1)
+            self.assertEqual(mock_conn_class.return_value.request.call_count, 2)
+            
+            method, path = mock_conn_class.return_value.request.call_args[0]
+            self.assertEqual(method, 'GET')
+            self.assertEqual(
+                path, '/v2/nearest_city?lat=33.656915&lon=-117.982542&key=test_key'
+            )
+            self.assertEqual(service.latest_data.aqi, 42)
+    
+    def test_connection_dropped_on_error(self):
+        """Test that a failed connection is discarded and reopened."""
+        with patch('airvisual.http.client.HTTPSConnection') as mock_conn_class:
+            mock_conn = mock_conn_class.return_value
+            mock_conn.request.side_effect = [ConnectionResetError(), None]
+            mock_conn.getresponse.return_value = self._mock_response()
+            service = self.new_service()
+            
+            self.assertFalse(service._collect_air_quality_data())
+            self.assertIsNone(service._connection)
+            
+            self.assertTrue(service._collect_air_quality_data())
+            self.assertEqual(mock_conn_class.call_count, 2)
+    
+    def test_stale_connection_retried(self):
+        """Test that a keep-alive connection closed by the server is retried once."""
+        with patch('airvisual.http.client.HTTPSConnection') as mock_conn_class:
+            mock_conn = mock_conn_class.return_value
+            mock_conn.getresponse.return_value = self._mock_response()
+            service = self.new_service()
+            self.assertTrue(service._collect_air_quality_data())
+            
+            # Server closes the idle connection before the next poll
+            mock_conn.request.side_effect = [http.client.RemoteDisconnected(), None]
+            self.assertTrue(service._collect_air_quality_data())
+            self.assertEqual(mock_conn_class.call_count, 2)
+    
+    def test_http_error_status(self):
+        """Test that non-200 responses are treated as failures."""
+        with patch('airvisual.http.client.HTTPSConnection') as mock_conn_class:
+            mock_conn_class.return_value.getresponse.return_value = self._mock_response(status=429)
+            service = self.new_service()
+            
+            self.assertFalse(service._collect_air_quality_data())
+            self.assertIsNone(service.latest_data)
+    
+    def test_unchanged_body_not_reparsed(self):
+        """Test that an identical response body refreshes data without parsing."""
+        with patch('airvisual.http.client.HTTPSConnection') as mock_conn_class:
+            mock_conn_class.return_value.getresponse.return_value = self._mock_response()
+            service = self.new_service()
+            
+            with patch('airvisual._now', return_value=1_000_000.0):
+                self.assertTrue(service._collect_air_quality_data())
+            
+            with patch.object(service, '_parse_api_response') as mock_parse, \
+                 patch('airvisual._now', return_value=1_000_600.0):
+                self.assertTrue(service._collect_air_quality_data())
+                mock_parse.assert_not_called()
+            
+            # The unchanged reading is republished as fresh
+            self.assertEqual(service.latest_data.aqi, 42)
+            self.assertEqual(service.latest_data.timestamp, 1_000_600.0)
+    
+    def test_conditional_request_not_modified(self):
+        """Test that the ETag is sent back and a 304 republishes the current data."""
+        with patch('airvisual.http.client.HTTPSConnection') as mock_conn_class:
+            mock_conn = mock_conn_class.return_value
+            mock_conn.getresponse.return_value = self._mock_response(headers={'ETag': '"abc"'})
+            service = self.new_service()
+            with patch('airvisual._now', return_value=1_000_000.0):
+                self.assertTrue(service._collect_air_quality_data())
+            
+            mock_conn.getresponse.return_value = self._mock_response(status=304)
+            with patch('airvisual._now', return_value=1_000_600.0):
+                self.assertTrue(service._collect_air_quality_data())
+            
+            sent_headers = mock_conn.request.call_args[1]['headers']
+            self.assertEqual(sent_headers['If-None-Match'], '"abc"')
+            self.assertEqual(service.latest_data.aqi, 42)
+            self.assertEqual(service.latest_data.timestamp, 1_000_600.0)
+    
+    def test_not_modified_without_data(self):
+        """Test that a 304 is a failure when there is no data to keep."""
+        with patch('airvisual.http.client.HTTPSConnection') as mock_conn_class:
+            mock_conn_class.return_value.getresponse.return_value = self._mock_response(status=304)
+            service = self.new_service()
+            
+            self.assertFalse(service._collect_air_quality_data())
+    
+    def test_invalid_json_response(self):
+        """Test that a malformed JSON body is treated as a failure."""
+        self.response_body = b'{"status": "success", "data":'
+        with patch('airvisual.http.client.HTTPSConnection') as mock_conn_class:
+            mock_conn_class.return_value.getresponse.return_value = self._mock_response()
+            service = self.new_service()
+            
+            self.assertFalse(service._collect_air_quality_data())
+            self.assertIsNone(service.latest_data)
+    
+    def test_shutdown_closes_connection(self):
+        """Test that shutdown releases the persistent connection."""
+        with patch('airvisual.http.client.HTTPSConnection') as mock_conn_class:
+            mock_conn_class.return_value.getresponse.return_value = self._mock_response()
+            service = self.new_service()
+            service._collect_air_quality_data()
+            
+            service.shutDown()
+            
+            mock_conn_class.return_value.close.assert_called_once()
+            self.assertIsNone(service._connection)
+    
+    def test_shutdown_aborts_request_in_flight(self):
+        """Test that shutdown unblocks a hung request before waiting for it."""
+        service = self.new_service()
+        connection = service._connection = Mock()
+        service.collection_future = Mock()
+        service.collection_future.done.return_value = False
+        
+        def wait(futures, timeout):
+            # The socket must already be shut down when shutdown starts waiting
+            connection.sock.shutdown.assert_called_once_with(airvisual.SHUT_RDWR)
+            return set(futures), set()
+        
+        with patch('airvisual.wait_futures', side_effect=wait) as mock_wait:
+            service.shutDown()
+        
+        mock_wait.assert_called_once()
+        connection.close.assert_called_once()
+
+
+class TestJSONBackend:
+    """Test the JSON backend used to parse API responses."""
+
+    def test_backend_parses_response_body(self):
+        """Test that the selected backend parses raw response bytes."""
+        assert airvisual.json_parser.loads(_RESPONSE_BODY)['data']['current']['pollution']['aqius'] == 42
+
+    def test_orjson_preferred(self):
+        """Test that orjson is used whenever it is installed."""
+        orjson = pytest.importorskip('orjson')
+        assert airvisual.json_parser is orjson
+
+
+class TestRetryLogic:
+    """Test exponential backoff retry logic."""
     
-    def test_retry_state_initialization(self):
+    def test_retry_state_initialization(self, retry_service):
         """Test retry state is properly initialized."""
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
-            
-            self.assertEqual(service.retry_state['consecutive_failures'], 0)
-            self.assertEqual(service.retry_state['current_wait_time'], 60)
-            self.assertIsNone(service.retry_state['last_success_time'])
+        assert retry_service.retry_state['consecutive_failures'] == 0
+        assert retry_service.retry_state['current_wait_time'] == 60
+        assert retry_service.retry_state['last_success_time'] is None
     
-    def test_retry_state_reset_on_success(self):
+    def test_retry_state_reset_on_success(self, retry_service):
         """Test retry state resets after successful API call."""
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
+        # Simulate some failures
+        retry_service.retry_state['consecutive_failures'] = 3
+        retry_service.retry_state['current_wait_time'] = 240
             
-            # Simulate some failures
-            service.retry_state['consecutive_failures'] = 3
-            service.retry_state['current_wait_time'] = 240
+        # Reset on success
+        retry_service._reset_retry_state()
             
-            # Reset on success
-            service._reset_retry_state()
-            
-            self.assertEqual(service.retry_state['consecutive_failures'], 0)
-            self.assertEqual(service.retry_state['current_wait_time'], 60)
-            self.assertIsNotNone(service.retry_state['last_success_time'])
+        assert retry_service.retry_state['consecutive_failures'] == 0
+        assert retry_service.retry_state['current_wait_time'] == 60
+        assert retry_service.retry_state['last_success_time'] is not None
     
-    def test_exponential_backoff(self):
+    def test_exponential_backoff(self, retry_service):
         """Test exponential backoff calculation."""
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
-            
+        # Freeze the clock and pin the jitter to the top of its range so the
+        # progression is exact
+        with patch('airvisual._now', return_value=1_000_000.0), \
+             patch('airvisual.random.uniform', side_effect=lambda low, high: high):
             # Test progression: 60 -> 120 -> 240 -> 300 (max)
             expected_waits = [60, 120, 240, 300, 300]  # Caps at 300
             
             for i, expected_wait in enumerate(expected_waits):
-                current_time = time.time()
-                service._handle_api_failure()
+                retry_service._handle_api_failure()
                 
-                self.assertEqual(service.retry_state['consecutive_failures'], i + 1)
-                actual_wait = service.retry_state['next_retry_time'] - current_time
-                self.assertAlmostEqual(actual_wait, expected_wait, delta=1.0)
+                assert retry_service.retry_state['consecutive_failures'] == i + 1
+                actual_wait = retry_service.retry_state['next_retry_time'] - 1_000_000.0
+                assert actual_wait == expected_wait
+    
+    def test_backoff_jitter_range(self, retry_service):
+        """Test jittered wait stays between half and all of the backoff cap."""
+        with patch('airvisual._now', return_value=1_000_000.0):
+            expected_caps = [60, 120, 240, 300, 300]
+            
+            for expected_cap in expected_caps:
+                retry_service._handle_api_failure()
+                
+                actual_wait = retry_service.retry_state['next_retry_time'] - 1_000_000.0
+                assert actual_wait >= expected_cap * 0.5
+                assert actual_wait <= expected_cap
 
 
-class TestUtilityFunctions(unittest.TestCase):
+class TestUtilityFunctions:
     """Test utility functions for data conversion."""
     
-    def test_aqi_to_level_conversion(self):
+    @pytest.mark.parametrize("aqi, expected_level", [
+        (0, "Good"),
+        (25, "Good"),
+        (50, "Good"),
+        (50.5, "Moderate"),
+        (75, "Moderate"),
+        (100, "Moderate"),
+        (125, "Unhealthy for Sensitive Groups"),
+        (150, "Unhealthy for Sensitive Groups"),
+        (175, "Unhealthy"),
+        (200, "Unhealthy"),
+        (250, "Very Unhealthy"),
+        (300, "Very Unhealthy"),
+        (300.1, "Hazardous"),
+        (350, "Hazardous"),
+        (500, "Hazardous"),
+        (None, None)
+    ])
+    def test_aqi_to_level_conversion(self, aqi, expected_level):
         """Test AQI numeric to level conversion."""
-        test_cases = [
-            (25, "Good"),
-            (50, "Good"),
-            (75, "Moderate"),
-            (100, "Moderate"),
-            (125, "Unhealthy for Sensitive Groups"),
-            (150, "Unhealthy for Sensitive Groups"),
-            (175, "Unhealthy"),
-            (200, "Unhealthy"),
-            (250, "Very Unhealthy"),
-            (300, "Very Unhealthy"),
-            (350, "Hazardous"),
-            (500, "Hazardous"),
-            (None, None)
-        ]
-        
-        for aqi, expected_level in test_cases:
-            result = airvisual.convert_aqi_to_level(aqi)
-            self.assertEqual(result, expected_level, f"AQI {aqi} should be {expected_level}")
-    
-    def test_pollutant_code_conversion(self):
+        assert airvisual.convert_aqi_to_level(aqi) == expected_level
+    
+    @pytest.mark.parametrize("boundary, level_below, level_above", [
+        (50, "Good", "Moderate"),
+        (100, "Moderate", "Unhealthy for Sensitive Groups"),
+        (150, "Unhealthy for Sensitive Groups", "Unhealthy"),
+        (200, "Unhealthy", "Very Unhealthy"),
+        (300, "Very Unhealthy", "Hazardous")
+    ])
+    def test_aqi_band_boundaries(self, boundary, level_below, level_above):
+        """Test that each band boundary belongs to the band below it."""
+        assert airvisual.convert_aqi_to_level(boundary) == level_below
+        assert airvisual.convert_aqi_to_level(boundary + 0.01) == level_above
+    
+    @pytest.mark.parametrize("aqi", [0, 42, 100, 175, 500])
+    def test_aqi_level_is_table_entry(self, aqi):
+        """Test that levels are returned from the label table, not built per call."""
+        assert any(airvisual.convert_aqi_to_level(aqi) is label for label in airvisual._AQI_LABELS)
+    
+    @pytest.mark.parametrize("code, expected_name", [
+        ('p2', 'PM2.5'),
+        ('p1', 'PM10'),
+        ('o3', 'Ozone'),
+        ('n2', 'NO2'),
+        ('s2', 'SO2'),
+        ('co', 'CO'),
+        ('unknown', 'unknown'),  # Unknown codes pass through
+        (None, None)
+    ])
+    def test_pollutant_code_conversion(self, code, expected_name):
         """Test pollutant code to name conversion."""
-        test_cases = [
-            ('p2', 'PM2.5'),
-            ('p1', 'PM10'),
-            ('o3', 'Ozone'),
-            ('n2', 'NO2'),
-            ('s2', 'SO2'),
-            ('co', 'CO'),
-            ('unknown', 'unknown'),  # Unknown codes pass through
-            (None, None)
-        ]
+        assert airvisual.convert_pollutant_code(code) == expected_name
+    
+    @pytest.mark.parametrize("converter, value", [
+        (airvisual.convert_aqi_to_level, 50),
+        (airvisual.convert_pollutant_code, 'p2')
+    ], ids=['aqi_level', 'pollutant'])
+    def test_conversion_cached(self, converter, value):
+        """Test that repeated conversions are served from the cache."""
+        first = converter(value)
+        hits = converter.cache_info().hits
         
-        for code, expected_name in test_cases:
-            result = airvisual.convert_pollutant_code(code)
-            self.assertEqual(result, expected_name, f"Code {code} should be {expected_name}")
+        assert converter(value) is first
+        assert converter.cache_info().hits == hits + 1
 
 
-class TestThreadSafety(unittest.TestCase):
+class TestThreadSafety:
     """Test thread-safe operations."""
     
-    def setUp(self):
-        """Set up test fixtures."""
-        self.mock_engine = Mock()
-        self.mock_engine.config_dict = {
-            'Station': {'latitude': 33.656915, 'longitude': -117.982542},
-            'AirVisualService': {
-                'enable': False,  # Don't start background thread
-                'api_key': 'test_key',
-                'interval': 600,
-                'timeout': 30
-            }
-        }
-    
-    def test_data_lock_usage(self):
+    def test_data_lock_usage(self, disabled_service):
         """Test that data access uses proper locking."""
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
-            
-            # Test data writing with lock
-            test_data = {'aqi': 42, 'main_pollutant': 'PM2.5', 'timestamp': time.time()}
-            with service.data_lock:
-                service.latest_data = test_data
+        # Test data writing with lock
+        test_data = airvisual.AirQualitySnapshot(42, 'PM2.5', 'Good', time.monotonic())
+        with disabled_service.data_lock:
+            disabled_service.latest_data = test_data
             
-            # Test data reading with lock
-            with service.data_lock:
-                retrieved_data = service.latest_data.copy()
+        # Test data reading with lock
+        with disabled_service.data_lock:
+            retrieved_data = disabled_service.latest_data
             
-            self.assertEqual(retrieved_data['aqi'], 42)
-            self.assertEqual(retrieved_data['main_pollutant'], 'PM2.5')
+        assert retrieved_data.aqi == 42
+        assert retrieved_data.main_pollutant == 'PM2.5'
     
-    def test_concurrent_data_access(self):
+    @pytest.mark.slow
+    def test_concurrent_data_access(self, disabled_service):
         """Test concurrent data access safety."""
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
-            
-            results = []
-            errors = []
-            
-            def writer_thread():
-                try:
-                    for i in range(10):
-                        with service.data_lock:
-                            service.latest_data = {'aqi': i, 'timestamp': time.time()}
-                        time.sleep(0.001)  # Small delay
-                except Exception as e:
-                    errors.append(e)
-            
-            def reader_thread():
-                try:
-                    for i in range(10):
-                        with service.data_lock:
-                            data = service.latest_data.copy()
-                        results.append(data.get('aqi'))
-                        time.sleep(0.001)  # Small delay
-                except Exception as e:
-                    errors.append(e)
-            
-            # Start concurrent threads
-            threads = []
-            for _ in range(2):
-                threads.append(threading.Thread(target=writer_thread))
-                threads.append(threading.Thread(target=reader_thread))
-            
-            for thread in threads:
-                thread.start()
-            
-            for thread in threads:
-                thread.join(timeout=5)
-            
-            # No errors should occur with proper locking
-            self.assertEqual(len(errors), 0, f"Thread safety errors: {errors}")
-
-
-class TestArchiveRecordInjection(unittest.TestCase):
-    """Test injection of air quality data into archive records."""
-    
-    def setUp(self):
-        """Set up test fixtures."""
-        self.mock_engine = Mock()
-        self.mock_engine.config_dict = {
-            'Station': {'latitude': 33.656915, 'longitude': -117.982542},
-            'AirVisualService': {
-                'enable': False,  # Don't start background thread
-                'api_key': 'test_key',
-                'interval': 600,
-                'timeout': 30,
-                'log_success': False
-            }
-        }
-    
-    def test_fresh_data_injection(self):
-        """Test injection of fresh air quality data."""
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
-            
-            # Set up fresh data
-            fresh_data = {
-                'aqi': 42,
-                'main_pollutant': 'PM2.5',
-                'aqi_level': 'Good',
-                'timestamp': time.time()
-            }
-            
-            with service.data_lock:
-                service.latest_data = fresh_data
+        results = []
+        errors = []
+        
+        # Release all four threads at once so they contend for the lock
+        start_barrier = threading.Barrier(4)
+        
+        def writer_thread():
+            try:
+                start_barrier.wait(timeout=5)
+                for i in range(100):
+                    with disabled_service.data_lock:
+                        disabled_service.latest_data = airvisual.AirQualitySnapshot(
+                            i, 'PM2.5', 'Good', time.monotonic()
+                        )
+            except Exception as e:
+                errors.append(e)
+        
+        def reader_thread():
+            try:
+                start_barrier.wait(timeout=5)
+                for i in range(100):
+                    with disabled_service.data_lock:
+                        data = disabled_service.latest_data
+                    results.append(data.aqi if data is not None else None)
+            except Exception as e:
+                errors.append(e)
+        
+        # Start concurrent threads
+        threads = []
+        for _ in range(2):
+            threads.append(threading.Thread(target=writer_thread))
+            threads.append(threading.Thread(target=reader_thread))
             
-            # Create mock event
-            mock_event = Mock()
-            mock_event.record = {}
+        for thread in threads:
+            thread.start()
             
-            # Call injection method
-            service.new_archive_record(mock_event)
+        for thread in threads:
+            thread.join(timeout=5)
             
-            # Verify data was injected
-            self.assertEqual(mock_event.record['aqi'], 42)
-            self.assertEqual(mock_event.record['main_pollutant'], 'PM2.5')
-            self.assertEqual(mock_event.record['aqi_level'], 'Good')
+        # No errors should occur with proper locking
+        assert len(errors) == 0, f"Thread safety errors: {errors}"
+        assert len(results) == 200
+
+
+class TestArchiveRecordInjection:
+    """Test injection of air quality data into archive records."""
     
-    def test_stale_data_handling(self):
-        """Test handling of stale air quality data."""
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
-            
-            # Set up stale data (older than 2 intervals)
-            stale_data = {
-                'aqi': 42,
-                'main_pollutant': 'PM2.5',
-                'aqi_level': 'Good',
-                'timestamp': time.time() - 1300  # > 2 * 600 seconds
-            }
-            
-            with service.data_lock:
-                service.latest_data = stale_data
-            
-            # Create mock event
-            mock_event = Mock()
-            mock_event.record = {}
-            
-            # Call injection method
-            service.new_archive_record(mock_event)
-            
-            # Verify stale data was not injected (set to None)
-            self.assertIsNone(mock_event.record['aqi'])
-            self.assertIsNone(mock_event.record['main_pollutant'])
-            self.assertIsNone(mock_event.record['aqi_level'])
+    NOW = 1_000_000.0
+    
+    @pytest.fixture(autouse=True)
+    def frozen_clock(self, monkeypatch):
+        """Freeze the service clock at NOW."""
+        monkeypatch.setattr(airvisual, '_now', lambda: self.NOW)
+    
+    @pytest.mark.parametrize("age_seconds, expected", [
+        (0, (42, 'PM2.5', 'Good')),
+        (1200, (42, 'PM2.5', 'Good')),  # Exactly 2 intervals old is still used
+        (1300, (None, None, None))  # > 2 * 600 seconds
+    ], ids=['fresh', 'max-age', 'stale'])
+    def test_data_injection(self, disabled_service, monkeypatch, age_seconds, expected):
+        """Test that data is injected only while it is at most two intervals old."""
+        snapshot = airvisual.AirQualitySnapshot(
+            aqi=42,
+            main_pollutant='PM2.5',
+            aqi_level='Good',
+            timestamp=self.NOW - age_seconds
+        )
+        monkeypatch.setattr(disabled_service, 'latest_data', snapshot)
+        event = SimpleNamespace(record={})
+        
+        disabled_service.new_archive_record(event)
+        
+        record = event.record
+        assert (record['aqi'], record['main_pollutant'], record['aqi_level']) == expected
     
-    def test_no_data_handling(self):
+    def test_no_data_handling(self, disabled_service, monkeypatch):
         """Test handling when no air quality data is available."""
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
+        monkeypatch.setattr(disabled_service, 'latest_data', None)
+        event = SimpleNamespace(record={})
+        
+        disabled_service.new_archive_record(event)
+        
+        # Verify None values were set
+        assert event.record == {'aqi': None, 'main_pollutant': None, 'aqi_level': None}
+
+
+class TestServiceShutdown:
+    """Test service shutdown behavior."""
+    
+    @pytest.mark.slow
+    def test_clean_shutdown(self, disabled_service):
+        """Test clean shutdown of the service."""
+        collected = threading.Event()
+        
+        def collect():
+            collected.set()
+            return True
+        
+        with patch.object(airvisual.AirVisualService, '_collect_air_quality_data',
+                          side_effect=collect):
+            # Manually start background collection for testing
+            disabled_service._start_collection()
+            executor = disabled_service.collection_executor
+            assert executor is not None
             
-            # No data available (empty dict)
-            with service.data_lock:
-                service.latest_data = {}
+            # Wait for the first (immediate) collection to run
+            assert collected.wait(timeout=5)
             
-            # Create mock event
-            mock_event = Mock()
-            mock_event.record = {}
+            # Call shutdown
+            disabled_service.shutDown()
             
-            # Call injection method
-            service.new_archive_record(mock_event)
+            # Verify shutdown event was set
+            assert disabled_service.shutdown_event.is_set()
             
-            # Verify None values were set
-            self.assertIsNone(mock_event.record['aqi'])
-            self.assertIsNone(mock_event.record['main_pollutant'])
-            self.assertIsNone(mock_event.record['aqi_level'])
+            # Verify the shared worker pool was released and stopped
+            assert disabled_service.collection_executor is None
+            assert airvisual.AirVisualService._executor is None
+            assert executor._shutdown
 
 
-class TestServiceShutdown(unittest.TestCase):
-    """Test service shutdown behavior."""
+class TestCollectionScheduling(ServiceTemplateTestCase):
+    """Test scheduling of API collections from WeeWX loop packets."""
     
-    def setUp(self):
-        """Set up test fixtures."""
-        self.mock_engine = Mock()
-        self.mock_engine.config_dict = {
-            'Station': {'latitude': 33.656915, 'longitude': -117.982542},
-            'AirVisualService': {
-                'enable': False,  # Don't auto-start thread
-                'api_key': 'test_key',
-                'interval': 600,
-                'timeout': 30
-            }
-        }
+    config_dict = make_cfg(enable=False)  # Don't auto-start collection
     
-    def test_clean_shutdown(self):
-        """Test clean shutdown of the service."""
-        with patch('airvisual.log'):
-            service = airvisual.AirVisualService(self.mock_engine, self.mock_engine.config_dict)
+    @pytest.mark.slow
+    def test_instances_share_executor(self):
+        """Test that service instances share one worker pool until the last stops."""
+        with patch.object(airvisual.AirVisualService, '_collect_air_quality_data',
+                          return_value=True):
+            first = self.new_service()
+            second = self.new_service()
             
-            # Manually create and start a thread for testing
-            service.api_thread = threading.Thread(
-                target=lambda: time.sleep(0.1),  # Short-lived thread
-                daemon=True
-            )
-            service.api_thread.start()
+            first._start_collection()
+            second._start_collection()
+            self.assertIs(first.collection_executor, second.collection_executor)
+            executor = first.collection_executor
             
-            # Verify thread is alive
-            self.assertTrue(service.api_thread.is_alive())
+            first.shutDown()
+            self.assertIs(airvisual.AirVisualService._executor, executor)
+            self.assertFalse(executor._shutdown)
             
-            # Call shutdown
-            service.shutDown()
+            second.shutDown()
+            self.assertIsNone(airvisual.AirVisualService._executor)
+            self.assertTrue(executor._shutdown)
+    
+    def test_collection_due_after_interval(self):
+        """Test that a successful collection makes the next one due an interval later."""
+        with patch.object(airvisual.AirVisualService, '_collect_air_quality_data',
+                          return_value=True):
+            service = self.new_service()
             
-            # Verify shutdown event was set
-            self.assertTrue(service.shutdown_event.is_set())
-            
-            # Wait for thread to finish
-            service.api_thread.join(timeout=1)
-            self.assertFalse(service.api_thread.is_alive())
-
-
-def run_tests():
-    """Run all tests."""
-    print("WeeWX AirVisual Extension - Unit Test Suite")
-    print("=" * 50)
-    
-    # Create test suite
-    test_classes = [
-        TestAirVisualService,
-        TestAPIResponseParsing,
-        TestRetryLogic,
-        TestUtilityFunctions,
-        TestThreadSafety,
-        TestArchiveRecordInjection,
-        TestServiceShutdown
-    ]
-    
-    suite = unittest.TestSuite()
-    for test_class in test_classes:
-        tests = unittest.TestLoader().loadTestsFromTestCase(test_class)
-        suite.addTests(tests)
-    
-    # Run tests
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-    
-    # Print summary
-    print("\n" + "=" * 50)
-    print(f"Tests run: {result.testsRun}")
-    print(f"Failures: {len(result.failures)}")
-    print(f"Errors: {len(result.errors)}")
-    
-    if result.failures:
-        print("\nFAILURES:")
-        for test, traceback in result.failures:
-            print(f"- {test}: {traceback}")
-    
-    if result.errors:
-        print("\nERRORS:")
-        for test, traceback in result.errors:
-            print(f"- {test}: {traceback}")
-    
-    success = len(result.failures) == 0 and len(result.errors) == 0
-    print(f"\nResult: {'✅ PASSED' if success else '❌ FAILED'}")
-    
-    return success
-
-
-if __name__ == '__main__':
-    success = run_tests()
-    sys.exit(0 if success else 1)
+            before = time.monotonic()
+            service._run_collection()
+            
+            self.assertAlmostEqual(service._next_collection - before, 600, delta=1.0)
+    
+    def test_failed_collection_due_after_backoff(self):
+        """Test that a failed collection makes the next one due at the retry time."""
+        with patch.object(airvisual.AirVisualService, '_collect_air_quality_data',
+                          return_value=False):
+            service = self.new_service()
+            
+            service._run_collection()
+            
+            self.assertEqual(service._next_collection, service.retry_state['next_retry_time'])
+            self.assertEqual(service.retry_state['consecutive_failures'], 1)
+    
+    def test_failure_during_shutdown_not_counted(self):
+        """Test that a request aborted by shutdown is not treated as an API failure."""
+        service = self.new_service()
+        
+        def collect():
+            service.shutdown_event.set()
+            return False
+        
+        with patch.object(service, '_collect_air_quality_data', side_effect=collect), \
+             patch.object(service, '_handle_api_failure') as mock_failure:
+            service._run_collection()
+        
+        mock_failure.assert_not_called()
+        self.assertEqual(service.retry_state['consecutive_failures'], 0)
+    
+    def test_loop_packet_submits_due_collection(self):
+        """Test that a loop packet starts a collection only when one is due."""
+        service = self.new_service()
+        service.collection_executor = Mock()
+        event = SimpleNamespace(packet={})
+            
+        # Not yet due
+        service._next_collection = time.monotonic() + 600
+        service.new_loop_packet(event)
+        service.collection_executor.submit.assert_not_called()
+            
+        # Due
+        service._next_collection = time.monotonic() - 1
+        service.new_loop_packet(event)
+        service.collection_executor.submit.assert_called_once_with(service._run_collection)
+    
+    def test_loop_packet_skips_collection_in_flight(self):
+        """Test that a loop packet doesn't start a second concurrent collection."""
+        service = self.new_service()
+        service.collection_executor = Mock()
+        service.collection_future = Mock()
+        service.collection_future.done.return_value = False
+            
+        service._next_collection = time.monotonic() - 1
+        service.new_loop_packet(SimpleNamespace(packet={}))
+        service.collection_executor.submit.assert_not_called()
+
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the AirVisual extension installer.
+
+Covers database schema extension against a temporary SQLite archive,
+service registration in [Engine] and validation of the interactive
+prompts.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import configobj
+import pytest
+
+import install  # Importable via the repository root path set up in conftest.py
+
+AIRVISUAL = 'user.airvisual.AirVisualService'
+
+
+def _register(data_services):
+    """Run service registration and return the resulting data_services."""
+    config_dict = configobj.ConfigObj({'Engine': {'Services': {}}})
+    if data_services is not None:
+        config_dict['Engine']['Services']['data_services'] = data_services
+    install.AirVisualInstaller()._register_service(config_dict)
+    return config_dict['Engine']['Services']['data_services']
+
+
+def _answer(monkeypatch, *answers):
+    """Feed answers to input() and return the iterator, to check they were all used."""
+    replies = iter(answers)
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(replies))
+    return replies
+
+
+@pytest.fixture
+def archive_cfg(tmp_path, monkeypatch):
+    """A configuration with a freshly initialized SQLite archive under tmp_path."""
+    manager = pytest.importorskip('weewx.manager')
+    config_dict = configobj.ConfigObj({
+        'WEEWX_ROOT': str(tmp_path),
+        'DataBindings': {'wx_binding': {
+            'database': 'archive_sqlite',
+            'table_name': 'archive',
+            'manager': 'weewx.manager.DaySummaryManager',
+            'schema': 'schemas.wview_extended.schema'
+        }},
+        'Databases': {'archive_sqlite': {'database_name': 'weewx.sdb', 'database_type': 'SQLite'}},
+        'DatabaseTypes': {'SQLite': {'driver': 'weedb.sqlite', 'SQLITE_ROOT': str(tmp_path)}}
+    })
+    manager.open_manager_with_config(config_dict, 'wx_binding', initialize=True).close()
+    # The unit mappings are global to weewx.units; keep them out of other tests
+    monkeypatch.setattr(install.AirVisualInstaller, '_setup_unit_system', Mock())
+    return config_dict
+
+
+def _archive_schema(config_dict):
+    """Return (archive column names, table names) of the test archive."""
+    import weedb
+    import weewx.manager
+    
+    manager_dict = weewx.manager.get_manager_dict_from_config(config_dict, 'wx_binding')
+    connection = weedb.connect(manager_dict['database_dict'])
+    try:
+        return set(connection.columnsOf('archive')), set(connection.tables())
+    finally:
+        connection.close()
+
+
+def _add_column(config_dict, column):
+    """Add a column to the test archive behind the installer's back."""
+    import weedb
+    import weewx.manager
+    
+    manager_dict = weewx.manager.get_manager_dict_from_config(config_dict, 'wx_binding')
+    connection = weedb.connect(manager_dict['database_dict'])
+    try:
+        with weedb.Transaction(connection) as cursor:
+            cursor.execute(f"ALTER TABLE archive ADD COLUMN {column}")
+    finally:
+        connection.close()
+
+
+class FakeMySQLConnection:
+    """Just enough of a weedb MySQL connection for direct SQL field creation."""
+    
+    dbtype = 'mysql'
+    
+    def __init__(self, existing):
+        self.existing = set(existing)
+        self.statements = []
+    
+    def cursor(self):
+        return self
+    
+    def execute(self, statement):
+        self.statements.append(statement)
+        for column in self.existing:
+            if f"ADD COLUMN {column} " in statement:
+                raise Exception(f"(1060, \"Duplicate column name '{column}'\")")
+    
+    def begin(self):
+        pass
+    
+    def commit(self):
+        pass
+    
+    def rollback(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+class TestExtendDatabaseSchema:
+    """Test adding the AirVisual fields to the archive."""
+    
+    def test_first_run_adds_fields(self, archive_cfg):
+        """Test that all fields, and the daily summary for aqi, are added."""
+        install.AirVisualInstaller()._extend_database_schema(archive_cfg)
+        
+        columns, tables = _archive_schema(archive_cfg)
+        assert {'aqi', 'main_pollutant', 'aqi_level'} <= columns
+        assert 'archive_day_aqi' in tables
+    
+    def test_second_run_skips_manager(self, archive_cfg, monkeypatch, capsys):
+        """Test that a fully migrated archive is left alone without building a manager."""
+        import weeutil.weeutil
+        
+        installer = install.AirVisualInstaller()
+        installer._extend_database_schema(archive_cfg)
+        capsys.readouterr()
+        
+        get_object = Mock(wraps=weeutil.weeutil.get_object)
+        monkeypatch.setattr(weeutil.weeutil, 'get_object', get_object)
+        installer._extend_database_schema(archive_cfg)
+        
+        # get_object still resolves the schema name, but never the manager
+        managers = [c for c in get_object.call_args_list if c.args == ('weewx.manager.DaySummaryManager',)]
+        assert managers == []
+        assert "All required fields already exist" in capsys.readouterr().out
+    
+    def test_partially_migrated_archive(self, archive_cfg, capsys):
+        """Test that a field already present is skipped and the rest are added."""
+        _add_column(archive_cfg, 'main_pollutant VARCHAR(10)')
+        
+        install.AirVisualInstaller()._extend_database_schema(archive_cfg)
+        
+        out = capsys.readouterr().out
+        assert "main_pollutant - already exists, skipping" in out
+        assert "completed successfully" in out
+        columns, _ = _archive_schema(archive_cfg)
+        assert {'aqi', 'main_pollutant', 'aqi_level'} <= columns
+    
+    def test_duplicate_text_column_treated_as_added(self, archive_cfg, monkeypatch, capsys):
+        """Test that a text column created after the schema check counts as added."""
+        installer = install.AirVisualInstaller()
+        check_existing_fields = installer._check_existing_fields
+        
+        def stale_check(connection, table_name):
+            # Report the snapshot, then let another writer add a column
+            result = check_existing_fields(connection, table_name)
+            _add_column(archive_cfg, 'aqi_level VARCHAR(30)')
+            return result
+        
+        monkeypatch.setattr(installer, '_check_existing_fields', stale_check)
+        installer._extend_database_schema(archive_cfg)
+        
+        out = capsys.readouterr().out
+        assert "Field 'aqi_level' already exists" in out
+        assert "completed successfully" in out
+        columns, _ = _archive_schema(archive_cfg)
+        assert {'aqi', 'main_pollutant', 'aqi_level'} <= columns
+    
+    def test_fields_not_added_reported(self, archive_cfg, monkeypatch, capsys):
+        """Test that the re-read schema catches fields that were not actually added."""
+        monkeypatch.setattr(install.AirVisualInstaller, '_add_missing_fields', Mock())
+        
+        install.AirVisualInstaller()._extend_database_schema(archive_cfg)
+        
+        out = capsys.readouterr().out
+        assert "Fields still missing after schema update: aqi, main_pollutant, aqi_level" in out
+        assert "completed successfully" not in out
+    
+    def test_mysql_batch_falls_back_per_column(self):
+        """Test that a duplicate in the batched MySQL ALTER retries one column at a time."""
+        connection = FakeMySQLConnection(existing={'main_pollutant'})
+        dbmanager = SimpleNamespace(table_name='archive', connection=connection)
+        
+        install.AirVisualInstaller()._add_fields_direct_sql(dbmanager, ['main_pollutant', 'aqi_level'])
+        
+        assert connection.statements == [
+            "ALTER TABLE archive ADD COLUMN main_pollutant VARCHAR(10), ADD COLUMN aqi_level VARCHAR(30)",
+            "ALTER TABLE archive ADD COLUMN main_pollutant VARCHAR(10)",
+            "ALTER TABLE archive ADD COLUMN aqi_level VARCHAR(30)"
+        ]
+    
+    def test_mysql_batch_other_error_raises(self):
+        """Test that a non-duplicate error from the batched ALTER is not retried."""
+        connection = FakeMySQLConnection(existing=())
+        connection.execute = Mock(side_effect=Exception("Access denied"))
+        dbmanager = SimpleNamespace(table_name='archive', connection=connection)
+        
+        with pytest.raises(Exception, match="Direct SQL field creation failed"):
+            install.AirVisualInstaller()._add_fields_direct_sql(dbmanager, ['main_pollutant', 'aqi_level'])
+        connection.execute.assert_called_once()
+
+
+class TestRegisterService:
+    """Test registration of the service in data_services."""
+    
+    @pytest.mark.parametrize("data_services, expected", [
+        ('weewx.engine.StdConvert, weewx.engine.StdCalibrate, weewx.engine.StdQC',
+         f'weewx.engine.StdConvert, {AIRVISUAL}, weewx.engine.StdCalibrate, weewx.engine.StdQC'),
+        ('weewx.engine.StdCalibrate, weewx.engine.StdQC',
+         f'weewx.engine.StdCalibrate, {AIRVISUAL}, weewx.engine.StdQC'),
+        ('user.other.Service', f'user.other.Service, {AIRVISUAL}'),
+        (None, AIRVISUAL)
+    ], ids=['after-stdconvert', 'before-stdqc', 'at-end', 'no-services'])
+    def test_insert_position(self, data_services, expected):
+        """Test that the service goes after StdConvert and before StdQC."""
+        assert _register(data_services) == expected
+    
+    def test_list_valued_data_services(self):
+        """Test that a data_services list, as ConfigObj parses it, is handled."""
+        assert _register(['weewx.engine.StdConvert', 'weewx.engine.StdQC']) == \
+            f'weewx.engine.StdConvert, {AIRVISUAL}, weewx.engine.StdQC'
+    
+    def test_whitespace_variant_duplicates_collapse(self):
+        """Test that duplicate registrations differing only in whitespace are written back once."""
+        data_services = ['weewx.engine.StdConvert', f' {AIRVISUAL}', f'{AIRVISUAL} ',
+                         'weewx.engine.StdQC']
+        assert _register(data_services) == \
+            f'weewx.engine.StdConvert, {AIRVISUAL}, weewx.engine.StdQC'
+    
+    def test_already_registered_unchanged(self):
+        """Test that an existing, duplicate-free registration is left as it is."""
+        data_services = ['weewx.engine.StdQC', AIRVISUAL]
+        assert _register(data_services) == data_services
+
+
+class TestPrompts:
+    """Test validation of the interactive installer prompts."""
+    
+    @pytest.mark.parametrize("rejected", [
+        'short', 'abc 123 def 456', 'abc123def456!'
+    ], ids=['too-short', 'spaces', 'punctuation'])
+    def test_api_key_rejected(self, monkeypatch, rejected):
+        """Test that an invalid API key is asked for again."""
+        replies = _answer(monkeypatch, rejected, 'abc-123_def456', 'y')
+        assert install.AirVisualInstaller()._prompt_for_api_key() == 'abc-123_def456'
+        assert next(replies, None) is None
+    
+    @pytest.mark.parametrize("answer, expected", [
+        ('', 600), ('15', 900)
+    ], ids=['default', 'explicit'])
+    def test_interval_accepted(self, monkeypatch, answer, expected):
+        """Test that a whole number of minutes is returned in seconds."""
+        _answer(monkeypatch, answer)
+        assert install.AirVisualInstaller()._prompt_for_interval() == expected
+    
+    @pytest.mark.parametrize("rejected", [
+        '-10', '+10', '10.5', 'ten', '4'
+    ], ids=['negative', 'signed', 'fractional', 'non-numeric', 'below-minimum'])
+    def test_interval_rejected(self, monkeypatch, rejected):
+        """Test that an invalid interval is asked for again."""
+        replies = _answer(monkeypatch, rejected, '10')
+        assert install.AirVisualInstaller()._prompt_for_interval() == 600
+        assert next(replies, None) is None